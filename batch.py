@@ -0,0 +1,169 @@
+"""Runs many projects from a JSONL file concurrently, each in its own process and workspace.
+
+    python batch.py objectives.jsonl --out ./runs --workers 4 --max-browsers 8 --max-llm-calls 16 --reserve-mb 2048
+
+Each line needs an "objective"; "id", "max_iterations", "agents", "traits" (a list), "team_size", "llm_name",
+"models" (a model routing config), "response_cache" (a directory, can be shared by every project),
+"steps_per_work_cycle", "dag", "parallel_rounds", "consensus" and "replay" (a cassette directory recorded with `main.py --record`) are optional.
+Results are written to <out>/<id>/result.json and <out>/results.jsonl.
+"""
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from os.path import join
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+from browser_backend import ReplayBrowserBackend
+from llm_backend import ReplayBackend
+from main import argument
+from model_router import ModelRouter
+from project import build_project
+from rate_limiter import rate_limiter
+from resource_governor import ResourceGovernor
+from response_cache import DiskResponseCache
+from tracing import setup_logging, tracer
+
+worker_options = {} # Set in every worker process by init_worker
+
+
+def init_worker(browser_slots, llm_slots, options: dict):
+    worker_options.update(options, browser_slots=browser_slots, llm_slots=llm_slots)
+    setup_logging(options["log_level"])
+
+
+def read_specs(path: str) -> list[dict]:
+    specs = []
+    with open(path, "r", encoding="utf-8") as f:
+        for i, line in enumerate(f):
+            if line.strip():
+                spec = json.loads(line)
+                spec.setdefault("id", f"project-{i}")
+                specs.append(spec)
+
+    if len({spec["id"] for spec in specs}) != len(specs):
+        raise ValueError(f"Project ids in {path} must be unique")
+
+    return specs
+
+
+def run_project(spec: dict, root: str, resume: bool) -> dict:
+    os.makedirs(root, exist_ok=True)
+    rate_limiter.configure(
+        requests_per_minute=worker_options["requests_per_minute"],
+        tokens_per_minute=worker_options["tokens_per_minute"],
+        shared_slots=worker_options["llm_slots"]
+    )
+
+    options = {}
+    if spec.get("replay"):
+        options["llm_backend"] = ReplayBackend(join(spec["replay"], "llm.jsonl"))
+        options["browser_backend"] = ReplayBrowserBackend(join(spec["replay"], "work.jsonl"))
+
+    project = build_project(
+        spec["objective"],
+        max_iterations=spec.get("max_iterations", 6),
+        total_agents=spec.get("agents", 3),
+        traits=spec.get("traits"),
+        team_size=spec.get("team_size"),
+        llm_name=spec.get("llm_name", "gemini-2.5-flash"),
+        router=ModelRouter.from_config(spec["models"], spec.get("llm_name", "gemini-2.5-flash")) if spec.get("models") else None,
+        response_cache=DiskResponseCache(spec["response_cache"]) if spec.get("response_cache") else None,
+        steps_per_work_cycle=spec.get("steps_per_work_cycle", 50),
+        parallel_rounds=spec.get("parallel_rounds", False),
+        dag_scheduling=spec.get("dag", False),
+        consensus_rule=spec.get("consensus", "unanimous"),
+        max_browsers=spec.get("agents", 3),
+        browser_slots=worker_options["browser_slots"],
+        resource_governor=ResourceGovernor(browser_rss_mb=worker_options["browser_mb"], reserve_mb=worker_options["reserve_mb"]), # Headroom is measured host-wide, so workers also wait for each other
+        workspace_root=root,
+        trace_path=join(root, "trace.jsonl"),
+        checkpoint_path=join(root, "checkpoint.json.gz"),
+        **options
+    )
+
+    result = {"id": spec["id"], "objective": spec["objective"], "root": root, "status": "finished", "error": None}
+    start = time.perf_counter()
+    try:
+        if resume:
+            project.resume()
+        project.execute()
+        if project.completed:
+            result["status"] = "completed" # Agents voted the objective done before running out of iterations
+    except Exception as e:
+        result["status"] = "failed"
+        result["error"] = f"{type(e).__name__}: {e}"
+
+    llm = tracer.totals.get("llm.generate_content", {})
+    work = tracer.totals.get("browser_agent.run", {})
+    output_dir = project.workspace.path("output")
+    result.update(
+        wall_s=round(time.perf_counter() - start, 2),
+        iterations=project.iteration_number,
+        phases_completed=project.phases_completed,
+        llm_calls=int(llm.get("count", 0)),
+        prompt_tokens=int(llm.get("prompt_tokens", 0)),
+        cached_tokens=int(llm.get("cached_tokens", 0)),
+        response_tokens=int(llm.get("response_tokens", 0)),
+        work_cycles=int(work.get("count", 0)),
+        steps_used=int(work.get("steps_used", 0)),
+        browser_cpu_s=round(work.get("browser_cpu_s", 0), 1),
+        peak_browser_rss_mb=round(max([footprint.peak_rss_mb for footprint in project.resource_governor.footprints.values()] or [0]), 1),
+        browser_footprint=project.resource_governor.stats(),
+        rate_limiter=rate_limiter.stats(),
+        output_files=sorted(name for name in os.listdir(output_dir) if not name.startswith(".")) if os.path.isdir(output_dir) else []
+    )
+
+    with open(join(root, "result.json"), "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2)
+
+    return result
+
+
+def print_summary(results: list[dict]):
+    print(f"\n{'project':<20} {'status':<10} {'wall s':>8} {'iters':>5} {'llm calls':>9} {'prompt tok':>10} {'cycles':>6} {'outputs':>7}  error")
+    for result in sorted(results, key=lambda result: result["id"]):
+        print(
+            f"{result['id']:<20} {result['status']:<10} {result.get('wall_s', 0):>8.1f} {result.get('iterations', 0):>5} {result.get('llm_calls', 0):>9} "
+            f"{result.get('prompt_tokens', 0):>10} {result.get('work_cycles', 0):>6} {len(result.get('output_files', [])):>7}  {result['error'] or ''}"
+        )
+
+
+def main():
+    specs = read_specs(sys.argv[1])
+    out = argument("--out", "./runs")
+    workers = int(argument("--workers", 2))
+    resume = "--resume" in sys.argv
+
+    context = multiprocessing.get_context("spawn") # No forked event loops, threads or browser handles
+    browser_slots = context.BoundedSemaphore(int(argument("--max-browsers", workers * 3))) # Chromium instances across all projects
+    llm_slots = context.BoundedSemaphore(int(argument("--max-llm-calls", 16))) # Model calls in flight across all projects
+    options = {
+        "log_level": argument("--log-level", "WARNING"),
+        "requests_per_minute": float(argument("--rpm", 1000)) / workers, # Each process gets an equal share of the quota
+        "tokens_per_minute": float(argument("--tpm", 1_000_000)) / workers,
+        "browser_mb": float(argument("--browser-mb", 600)),
+        "reserve_mb": float(argument("--reserve-mb", 1024))
+    }
+
+    results = []
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context, max_tasks_per_child=1, initializer=init_worker, initargs=(browser_slots, llm_slots, options)) as pool:
+        futures = {pool.submit(run_project, spec, os.path.abspath(join(out, spec["id"])), resume): spec for spec in specs}
+        for future in as_completed(futures):
+            spec = futures[future]
+            try:
+                result = future.result()
+            except Exception as e: # The worker process itself died
+                result = {"id": spec["id"], "objective": spec["objective"], "status": "crashed", "error": f"{type(e).__name__}: {e}"}
+            results.append(result)
+            print(f"{result['id']}: {result['status']}" + (f" ({result['error']})" if result["error"] else ""))
+
+    with open(join(out, "results.jsonl"), "w", encoding="utf-8") as f:
+        f.writelines(json.dumps(result) + "\n" for result in results)
+
+    print_summary(results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Measures how long the project's modules take to import, using `python -X importtime`.
+
+    python benchmarks/bench_imports.py                    # every entry module, median of 5 fresh interpreters
+    python benchmarks/bench_imports.py --budget-ms 500    # exits non-zero if an entry module is over budget
+    python benchmarks/bench_imports.py --module project --top 20
+
+Importing the library must not load browser_use, google.genai or pypdf; those are imported on first use.
+Fails as well if one of them shows up in a module's import graph.
+"""
+from os.path import abspath, dirname
+import statistics
+import subprocess
+import sys
+
+ROOT = dirname(dirname(abspath(__file__)))
+ENTRY_MODULES = ["project", "main", "batch", "llm_backend", "browser_backend", "workspace"]
+LAZY_DEPENDENCIES = ["browser_use", "google.genai", "pypdf"]
+
+
+def import_times(module: str) -> dict[str, int]:
+    # Cumulative microseconds per imported module, as printed by -X importtime on stderr
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], cwd=ROOT, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr}")
+
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        times[name.strip()] = int(cumulative)
+
+    return times
+
+
+def measure(module: str, runs: int) -> tuple[float, dict[str, int]]:
+    samples = [import_times(module) for _ in range(runs)]
+    return statistics.median(sample[module] for sample in samples) / 1000, samples[-1]
+
+
+def argument(name: str, default=None):
+    return sys.argv[sys.argv.index(name) + 1] if name in sys.argv else default
+
+
+if __name__ == "__main__":
+    runs = int(argument("--runs", 5))
+    budget_ms = float(argument("--budget-ms", 0)) or None
+    top = int(argument("--top", 0))
+    modules = [argument("--module")] if argument("--module") else ENTRY_MODULES
+    failures = []
+
+    print(f"{'module':<18} {'median ms':>9}  heavy dependencies loaded")
+    for module in modules:
+        median_ms, times = measure(module, runs)
+        loaded = [dependency for dependency in LAZY_DEPENDENCIES if dependency in times]
+        print(f"{module:<18} {median_ms:>9.1f}  {', '.join(loaded) or '-'}")
+
+        if loaded:
+            failures.append(f"{module} imports {', '.join(loaded)}")
+        if budget_ms is not None and median_ms > budget_ms:
+            failures.append(f"{module} took {median_ms:.1f} ms, budget is {budget_ms:.0f} ms")
+
+        if top:
+            for name, cumulative in sorted(times.items(), key=lambda item: item[1], reverse=True)[1:top + 1]:
+                print(f"    {name:<40} {cumulative / 1000:>9.1f}")
+
+    if failures:
+        print("\n" + "\n".join(failures))
+        sys.exit(1)
@@ -0,0 +1,219 @@
+"""Replays recorded projects offline and reports orchestration overhead per phase.
+
+    python benchmarks/bench_orchestration.py                      # synthetic cassettes for 3, 5 and 10 agents
+    python benchmarks/bench_orchestration.py --replay DIR --agents 3 # a run recorded with `main.py --record DIR`
+    python benchmarks/bench_orchestration.py --dag                # dependency-aware scheduling instead of lockstep work phases
+    python benchmarks/bench_orchestration.py --consensus majority # quorum rule for ending brainstorms and discussions
+    python benchmarks/bench_orchestration.py --team-size 5 --agent-counts 10,20,30 # hierarchical planning with sub-teams of 5
+    python benchmarks/bench_orchestration.py --models models.json --response-cache # model routing, and each project run twice over one cache
+
+No network access or browsers are needed: model calls and work cycles come from cassettes.
+"""
+from os.path import abspath, dirname, join
+import json
+import resource
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, dirname(dirname(abspath(__file__))))
+
+from browser_backend import ReplayBrowserBackend
+from llm_backend import ReplayBackend
+from model_router import ModelRouter
+from project import Agent, Project
+from prompts import AGENT_TRAITS
+from rate_limiter import rate_limiter
+from response_cache import ResponseCache
+from tracing import setup_logging, tracer
+
+OBJECTIVE = "Research the effects of tobacco on children and build a Flask website presenting the findings."
+LLM_SPAN = "llm.generate_content"
+WORK_SPAN = "browser_agent.run"
+
+
+def synthesize_steps(agent_id: int, iteration: int, steps: int) -> list[dict]:
+    # Every fourth source takes three identical scrolls to read, like a long article
+    records = []
+    for step in range(1, steps + 1):
+        source = (step + 3) // 4
+        scrolling = step % 4 != 1
+        records.append({
+            "step": step,
+            "goal": f"Scroll down to keep reading source {source}." if scrolling else f"Open source {source} about tobacco and children.",
+            "evaluation": "Success - more of the article is visible." if scrolling else f"Success - source {source - 1} has been read.",
+            "memory": f"Agent_{agent_id} has read {source - 1} sources for section {agent_id}, noting exposure rates, health effects and policy findings.",
+            "urls": [f"https://example.org/tobacco/{agent_id}/{source}"],
+            "files": [f"file_system_collab/agent_{agent_id}_iteration_{iteration}.md"] if step == steps else [],
+            "errors": []
+        })
+    return records
+
+
+def synthesize_cassette(directory: str, total_agents: int, max_iterations: int, steps: int = 20, work_s: float = 0.05, hierarchical: bool = False):
+    # Every discussion is scripted for three rounds: differing proposals, then the same plan with one agent
+    # still voting to keep talking, then a unanimous vote. Turns a consensus rule skips are replayed by the next discussion.
+    # Agent_0's work cycles take four times longer than everyone else's, like an uneven subtask split.
+    # In hierarchical mode the leads also plan with their sub-team, so every script is recorded twice.
+    repeats = 2 if hierarchical else 1
+    assignments = {f"Agent_{i}": f"Research and write section {i} of the report." for i in range(total_agents)}
+    llm = []
+    work = []
+
+    for agent_id in range(total_agents):
+        llm.extend({"key": f"Brainstorm:{agent_id}", "text": None, "parsed": {
+            "message_to_team": f"Agent_{agent_id} proposes splitting the objective into {total_agents} sections. " * 8,
+            "subtask_assignments": assignments,
+            "vote": True
+        }} for _ in range(repeats))
+
+        for iteration in [i for i in range(2, max_iterations + 1) for _ in range(repeats)]:
+            revised = {name: f"{task} Revise it with the feedback from iteration {iteration - 1}." for name, task in assignments.items()}
+            rounds = [
+                ({**revised, f"Agent_{agent_id}": f"{revised[f'Agent_{agent_id}']} Agent_{agent_id} also adds a summary table."}, False), # Everyone proposes a different tweak
+                (revised, agent_id != total_agents - 1), # Same plan all round, but the last agent still votes to keep talking
+                (revised, True)
+            ]
+            for round_assignments, end_discussion in rounds:
+                llm.append({"key": f"Discussion:{agent_id}", "text": None, "parsed": {
+                    "message_to_team": f"Agent_{agent_id} reviewed iteration {iteration - 1} and {'agrees' if end_discussion else 'suggests changes'}. " * 8,
+                    "subtask_assignments": round_assignments,
+                    "end_discussion_vote": end_discussion,
+                    "complete_project_vote": False
+                }})
+
+        for iteration in range(1, max_iterations * 4 + 1): # Enough for an agent that re-plans as often as the scheduler allows
+            llm.append({"key": f"Replan:{agent_id}", "text": None, "parsed": {
+                "message_to_team": f"Agent_{agent_id} continues with the next part of section {agent_id}.",
+                "next_task": f"Extend section {agent_id} of the report with more sources.",
+                "depends_on": [],
+                "wait_for_team": False
+            }})
+            work.append({
+                "key": f"work:{agent_id}",
+                "duration_s": work_s * (4 if agent_id == 0 else 1),
+                "steps": synthesize_steps(agent_id, iteration, steps),
+                "steps_used": steps,
+                "errors": 0,
+                "writes": [{
+                    "path": f"file_system_collab/agent_{agent_id}_iteration_{iteration}.md",
+                    "contents": f"# Findings of Agent_{agent_id}, iteration {iteration}\n\n" + "\n\n".join(f"Tobacco smoke exposure finding {i} for section {agent_id}." for i in range(40))
+                }]
+            })
+
+    for iteration in range(max_iterations * total_agents):
+        llm.append({"key": "Summary", "text": f"Summary {iteration}: the agents split the report into {total_agents} sections.", "parsed": None})
+
+    for name, entries in (("llm.jsonl", llm), ("work.jsonl", work)):
+        with open(join(directory, name), "w", encoding="utf-8") as f:
+            f.writelines(json.dumps(entry) + "\n" for entry in entries)
+
+
+class BenchmarkProject(Project):
+    phase_metrics: list[dict]
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.phase_metrics = []
+
+    def run_phase(self, phase: str):
+        calls = self.llm_backend.calls
+        prompt_tokens = tracer.totals.get(LLM_SPAN, {}).get("prompt_tokens", 0)
+        busy_s = tracer.totals.get(WORK_SPAN, {}).get("duration_s", 0)
+        start = time.perf_counter()
+
+        super().run_phase(phase)
+
+        wall_s = time.perf_counter() - start
+        self.phase_metrics.append({
+            "phase": phase,
+            "iteration": self.iteration_number,
+            "wall_s": wall_s,
+            "busy_s": tracer.totals.get(WORK_SPAN, {}).get("duration_s", 0) - busy_s, # Time agents spent inside work cycles
+            "llm_calls": self.llm_backend.calls - calls,
+            "prompt_tokens": tracer.totals.get(LLM_SPAN, {}).get("prompt_tokens", 0) - prompt_tokens,
+            "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024 # ru_maxrss is in KiB on Linux
+        })
+
+
+def run(cassette_dir: str, total_agents: int, max_iterations: int, parallel_rounds: bool, dag_scheduling: bool, time_scale: float, consensus_rule: str = "unanimous", team_size: int | None = None,
+        router: ModelRouter | None = None, response_cache: ResponseCache | None = None) -> list[dict]:
+    llm_backend = ReplayBackend(join(cassette_dir, "llm.jsonl"))
+
+    with tempfile.TemporaryDirectory() as workspace_root:
+        project = BenchmarkProject(
+            objective=OBJECTIVE,
+            max_iterations=max_iterations,
+            parallel_rounds=parallel_rounds,
+            recent_turns=total_agents * 2,
+            trace_path=None,
+            llm_backend=llm_backend,
+            browser_backend=ReplayBrowserBackend(join(cassette_dir, "work.jsonl"), time_scale=time_scale),
+            workspace_root=workspace_root,
+            dag_scheduling=dag_scheduling,
+            consensus_rule=consensus_rule,
+            team_size=team_size,
+            checkpoint_path=join(workspace_root, "checkpoint.json.gz")
+        )
+        for i in range(total_agents):
+            project.add_agent(Agent(
+                _id=i,
+                agent_traits=AGENT_TRAITS[i % len(AGENT_TRAITS)],
+                llm_name="gemini-2.5-flash",
+                steps_per_work_cycle=20,
+                total_agents=total_agents,
+                llm_backend=llm_backend,
+                router=router,
+                response_cache=response_cache
+            ))
+        project.execute()
+
+    if router is not None:
+        print(f"\nCalls by model: {dict(llm_backend.calls_by_model)}")
+    if response_cache is not None:
+        print(f"Response cache: {response_cache.stats()}")
+    return project.phase_metrics
+
+
+def report(label: str, total_agents: int, phases: list[dict]):
+    print(f"\n{label}")
+    print(f"{'phase':<12} {'iter':>4} {'wall ms':>9} {'llm calls':>9} {'prompt tok/call':>15} {'peak rss MB':>11} {'agent util':>10}")
+
+    for phase in phases:
+        per_call = phase["prompt_tokens"] / phase["llm_calls"] if phase["llm_calls"] else 0
+        utilization = f"{phase['busy_s'] / (phase['wall_s'] * total_agents):.0%}" if phase["busy_s"] else ""
+        print(f"{phase['phase']:<12} {phase['iteration']:>4} {phase['wall_s'] * 1000:>9.1f} {phase['llm_calls']:>9} {per_call:>15.0f} {phase['peak_rss_mb']:>11.1f} {utilization:>10}")
+
+    totals = {key: sum(phase[key] for phase in phases) for key in ("wall_s", "busy_s", "llm_calls", "prompt_tokens")}
+    print(f"{'total':<12} {'':>4} {totals['wall_s'] * 1000:>9.1f} {totals['llm_calls']:>9} {totals['prompt_tokens'] / max(totals['llm_calls'], 1):>15.0f} {phases[-1]['peak_rss_mb']:>11.1f} {totals['busy_s'] / (totals['wall_s'] * total_agents):>10.0%}")
+
+
+def argument(name: str, default=None):
+    return sys.argv[sys.argv.index(name) + 1] if name in sys.argv else default
+
+
+if __name__ == "__main__":
+    setup_logging(argument("--log-level", "WARNING"))
+    rate_limiter.configure(requests_per_minute=None, tokens_per_minute=None) # Replays have no quota, only orchestration overhead is measured
+    max_iterations = int(argument("--iterations", 4))
+    parallel_rounds = "--parallel-rounds" in sys.argv
+    dag_scheduling = "--dag" in sys.argv
+    time_scale = float(argument("--time-scale", 1.0)) # Share of each recorded work cycle's duration to replay
+    consensus_rule = argument("--consensus", "unanimous")
+    team_size = int(argument("--team-size")) if argument("--team-size") is not None else None
+    router = ModelRouter.load(argument("--models"), "gemini-2.5-flash") if argument("--models") is not None else None
+    runs = 2 if "--response-cache" in sys.argv else 1 # The second run asks the same questions again
+
+    if argument("--replay") is not None:
+        total_agents = int(argument("--agents", 3))
+        response_cache = ResponseCache() if runs > 1 else None
+        for i in range(runs):
+            report(f"{argument('--replay')} ({total_agents} agents), run {i + 1}", total_agents, run(argument("--replay"), total_agents, max_iterations, parallel_rounds, dag_scheduling, time_scale, consensus_rule, team_size, router, response_cache))
+    else:
+        for total_agents in [int(count) for count in argument("--agent-counts", "3,5,10").split(",")]:
+            with tempfile.TemporaryDirectory() as cassette_dir:
+                synthesize_cassette(cassette_dir, total_agents, max_iterations, hierarchical=team_size is not None)
+                mode = f", sub-teams of {team_size}" if team_size is not None else ""
+                response_cache = ResponseCache() if runs > 1 else None
+                for i in range(runs):
+                    report(f"Synthetic project, {total_agents} agents, {max_iterations} iterations{mode}, run {i + 1}", total_agents, run(cassette_dir, total_agents, max_iterations, parallel_rounds, dag_scheduling, time_scale, consensus_rule, team_size, router, response_cache))
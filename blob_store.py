@@ -0,0 +1,111 @@
+from dataclasses import asdict, dataclass, field
+from manifest import hash_file
+from os.path import basename, dirname, isfile, join
+from threading import Lock
+import json
+import os
+import shutil
+import tempfile
+
+
+@dataclass
+class Blob:
+    sha256: str
+    size: int
+    name: str # File name the contents were first stored under
+    urls: list[str] = field(default_factory=list) # Sources the contents were downloaded from
+
+
+def normalize_url(url: str) -> str:
+    return url.split("#", 1)[0].rstrip("/")
+
+
+class BlobStore:
+    # Content-addressed storage under <root>/.blobs. Workspace files are hard links to their blob, so identical
+    # downloads take the space of one and publishing a file to another namespace links it instead of copying.
+    # FileStore replaces files by rename, so editing a linked file gives it its own inode and never changes the blob.
+    directory: str
+    blobs: dict[str, Blob]
+    urls: dict[str, str]
+    saved_bytes: int
+
+    def __init__(self, root: str = "."):
+        self.directory = join(root, ".blobs")
+        self.index_path = join(self.directory, "index.json")
+        self.blobs = {}
+        self.urls = {} # normalized source URL -> sha256 of what was downloaded from it
+        self.saved_bytes = 0 # Bytes not stored twice because the contents were already there
+        self.lock = Lock()
+        os.makedirs(self.directory, exist_ok=True)
+
+        if isfile(self.index_path):
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+            self.blobs = {blob["sha256"]: Blob(**blob) for blob in index["blobs"] if isfile(self.blob_path(blob["sha256"]))}
+            self.urls = {url: digest for url, digest in index["urls"].items() if digest in self.blobs}
+
+    def blob_path(self, digest: str) -> str:
+        return join(self.directory, digest[:2], digest)
+
+    @staticmethod
+    def place(source: str, path: str):
+        # A hard link at `path`, swapped in by rename so readers never see a missing file; a copy where links are unsupported
+        fd, temp_path = tempfile.mkstemp(dir=dirname(path), prefix=".tmp-", suffix=".link")
+        os.close(fd)
+        os.remove(temp_path)
+        try:
+            try:
+                os.link(source, temp_path)
+            except OSError:
+                shutil.copyfile(source, temp_path) # Other file system, or one without hard links
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def save(self):
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, prefix=".tmp-", suffix=".json")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"blobs": [asdict(blob) for blob in self.blobs.values()], "urls": self.urls}, f)
+        os.replace(temp_path, self.index_path)
+
+    def ingest(self, path: str, url: str | None = None) -> tuple[Blob, bool]:
+        # Adds a workspace file's contents to the store; a duplicate is replaced by a link to the existing blob.
+        # Returns the blob and whether `path` was replaced, callers hold the FileStore lock for `path` (see Workspace.ingest)
+        digest = hash_file(path)
+        replaced = False
+        blob_path = self.blob_path(digest)
+
+        with self.lock:
+            blob = self.blobs.get(digest)
+            if blob is None:
+                os.makedirs(dirname(blob_path), exist_ok=True)
+                self.place(path, blob_path)
+                blob = self.blobs[digest] = Blob(sha256=digest, size=os.path.getsize(blob_path), name=basename(path))
+            elif not os.path.samefile(path, blob_path):
+                self.place(blob_path, path)
+                self.saved_bytes += blob.size
+                replaced = True
+
+            if url is not None and normalize_url(url) not in blob.urls:
+                blob.urls.append(normalize_url(url))
+                self.urls[normalize_url(url)] = digest
+            self.save()
+
+        return blob, replaced
+
+    def find_url(self, url: str) -> Blob | None:
+        with self.lock:
+            digest = self.urls.get(normalize_url(url))
+            return self.blobs.get(digest) if digest is not None else None
+
+    def link(self, digest: str, path: str):
+        # Makes the blob's contents appear at `path` without copying them
+        self.place(self.blob_path(digest), path)
+        with self.lock:
+            self.saved_bytes += self.blobs[digest].size
+
+    def stats(self) -> dict[str, int]:
+        with self.lock:
+            return {"blobs": len(self.blobs), "bytes": sum(blob.size for blob in self.blobs.values()), "urls": len(self.urls), "saved_bytes": self.saved_bytes}
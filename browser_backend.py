@@ -0,0 +1,195 @@
+from browser_pool import BrowserPool
+from cassette import Cassette
+from dataclasses import asdict, dataclass, field
+from os.path import join, relpath
+from step_budget import StallDetector
+from step_log import ERROR_CHARS, MEMORY_DIGEST_CHARS, StepRecord, digest
+from tools import WRITABLE_EXTENSIONS, build_tools
+from tracing import get_logger
+from workspace import FILE_TYPES, Workspace
+import asyncio
+import json
+import time
+
+logger = get_logger(__name__)
+
+
+@dataclass
+class WorkRun:
+    steps: list[StepRecord]
+    steps_used: int
+    errors: int
+    writes: list[dict] = field(default_factory=list) # Files written through the file tools, relative to the workspace root
+    stop_reason: str = "done" # done, max_steps, failed, deadline, or "stalled: ..."
+    duration_s: float = 0.0
+    progress_steps: int = 0 # Steps that reached a new page or wrote a file
+    last_progress_step: int = 0
+
+
+class BrowserBackend:
+    # Runs one agent's work cycle; swapped out to record or replay browser sessions
+    async def run(self, agent_id: int, task: str, llm_name: str, max_steps: int, workspace: Workspace, deadline_s: float | None = None) -> WorkRun:
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+
+def step_record(step: int, item, files: list[str]) -> StepRecord:
+    output = item.model_output
+    return StepRecord(
+        step=step,
+        goal=(output.next_goal or "") if output else "",
+        evaluation=(output.evaluation_previous_goal or "") if output else "",
+        memory=digest(output.memory, MEMORY_DIGEST_CHARS) if output else "",
+        urls=[item.state.url] if item.state.url else [],
+        files=sorted(set(files)),
+        errors=[digest(result.error, ERROR_CHARS) for result in item.result if result.error]
+    )
+
+
+class BrowserUseBackend(BrowserBackend):
+    def __init__(self, browser_pool: BrowserPool, stall_window: int = 10, stop_grace_s: float = 60):
+        self.browser_pool = browser_pool
+        self.stall_window = stall_window # Steps without progress, or identical actions, before a run is stopped
+        self.stop_grace_s = stop_grace_s # Time a stopped run gets to finish its step before it is cancelled
+
+    async def run(self, agent_id: int, task: str, llm_name: str, max_steps: int, workspace: Workspace, deadline_s: float | None = None) -> WorkRun:
+        from browser_llm import RateLimitedChatGoogle # Replays and batch parents never load browser_use
+        from browser_use import Agent as BrowserAgent
+
+        detector = StallDetector(self.stall_window)
+        files_written = 0
+        current_step = 0
+        files_by_step = {} # step number -> files the agent wrote while executing that step's actions
+        stop_reason = None
+        browser_agent = None
+        start = time.perf_counter()
+
+        def record_download(owner: int, url: str, path: str):
+            if owner == agent_id:
+                workspace.record_download(url, path)
+
+        def count_write(path: str, contents: str | None, author: int | None):
+            nonlocal files_written
+            if author == agent_id:
+                files_written += 1
+                files_by_step.setdefault(current_step, []).append(relpath(path, workspace.root))
+
+        def stop(reason: str):
+            nonlocal stop_reason
+            if stop_reason is None:
+                stop_reason = reason
+                logger.warning(f"Stopping work cycle of agent {agent_id}: {reason}")
+                browser_agent.stop() # Ends the run after the current step, history is kept
+
+        def on_step(browser_state_summary, model_output, n_steps: int):
+            nonlocal current_step
+            current_step = n_steps # Called after the model answers and before the step's actions run
+            action = json.dumps([action.model_dump(exclude_none=True) for action in model_output.action], sort_keys=True, default=str)
+            stall = detector.observe(action, browser_state_summary.url, files_written)
+            if stall is not None:
+                stop(f"stalled: {stall}")
+
+        workspace.file_store.listeners.append(count_write)
+        self.browser_pool.download_listeners.append(record_download)
+        try:
+            async with self.browser_pool.lease(agent_id) as browser:
+                browser_llm = RateLimitedChatGoogle(model=llm_name, temperature=0.6)
+                browser_agent = BrowserAgent(
+                    task=task,
+                    llm=browser_llm, tools=build_tools(agent_id, workspace),
+                    available_file_paths=[workspace.path(file_type, agent_id) for file_type in FILE_TYPES],
+                    file_system_path=workspace.path("private", agent_id),
+                    browser=browser,
+                    max_history_items=50,
+                    register_new_step_callback=on_step
+                )
+                deadline = asyncio.get_running_loop().call_later(deadline_s, stop, "deadline") if deadline_s else None
+                try:
+                    # A hung page may never finish its step after stop(), so the run is cancelled after a grace period
+                    await asyncio.wait_for(browser_agent.run(max_steps=max_steps), timeout=deadline_s + self.stop_grace_s if deadline_s else None)
+                finally:
+                    if deadline is not None:
+                        deadline.cancel()
+        except TimeoutError:
+            stop_reason = "deadline" # The lease recycled the browser, the partial history is still usable
+        finally:
+            workspace.file_store.listeners.remove(count_write)
+            self.browser_pool.download_listeners.remove(record_download)
+
+        history = browser_agent.history
+        if stop_reason is None:
+            stop_reason = "done" if history.is_done() else "max_steps" if history.number_of_steps() >= max_steps else "failed"
+
+        return WorkRun(
+            steps=[step_record(i + 1, item, files_by_step.get(i + 1, [])) for i, item in enumerate(history.history)],
+            steps_used=history.number_of_steps(),
+            errors=sum(1 for error in history.errors() if error),
+            stop_reason=stop_reason,
+            duration_s=time.perf_counter() - start,
+            progress_steps=detector.progress_steps,
+            last_progress_step=detector.last_progress_step
+        )
+
+    async def close(self):
+        await self.browser_pool.close()
+
+
+class RecordingBrowserBackend(BrowserBackend):
+    def __init__(self, inner: BrowserBackend, path: str):
+        self.inner = inner
+        self.cassette = Cassette(path)
+
+    async def run(self, agent_id: int, task: str, llm_name: str, max_steps: int, workspace: Workspace, deadline_s: float | None = None) -> WorkRun:
+        writes = []
+
+        def capture(path: str, contents: str | None, author: int | None):
+            if author != agent_id:
+                return
+            if contents is None and path.split(".")[-1] in WRITABLE_EXTENSIONS:
+                with open(path, "r", encoding="utf-8") as f:
+                    contents = f.read() # A published text file replays as a write of its contents
+            if contents is not None:
+                writes.append({"path": relpath(path, workspace.root), "contents": contents}) # Like downloads, linked binary files are not recorded
+
+        workspace.file_store.listeners.append(capture)
+        try:
+            work_run = await self.inner.run(agent_id, task, llm_name, max_steps, workspace, deadline_s)
+        finally:
+            workspace.file_store.listeners.remove(capture)
+
+        work_run.writes = writes
+        self.cassette.append({"key": f"work:{agent_id}", "task": task, **asdict(work_run)})
+        return work_run
+
+    async def close(self):
+        await self.inner.close()
+
+
+class ReplayBrowserBackend(BrowserBackend):
+    calls: int
+
+    def __init__(self, path: str, time_scale: float = 0.0):
+        self.cassette = Cassette(path)
+        self.calls = 0
+        self.time_scale = time_scale # Fraction of the recorded duration to wait, so uneven work cycles can be reproduced
+
+    async def run(self, agent_id: int, task: str, llm_name: str, max_steps: int, workspace: Workspace, deadline_s: float | None = None) -> WorkRun:
+        entry = self.cassette.next(f"work:{agent_id}")
+        self.calls += 1
+        await asyncio.sleep(entry.get("duration_s", 0) * self.time_scale) # Lets the other agents' work cycles interleave as they would with real browsers
+
+        for write in entry["writes"]:
+            workspace.file_store.write(join(workspace.root, write["path"]), write["contents"], author=agent_id) # Same manifest and index updates as the live tools
+
+        return WorkRun(
+            steps=[StepRecord.from_dict(i + 1, step) for i, step in enumerate(entry["steps"])],
+            steps_used=entry["steps_used"],
+            errors=entry["errors"],
+            writes=entry["writes"],
+            stop_reason=entry.get("stop_reason", "done"),
+            duration_s=entry.get("duration_s", 0.0),
+            progress_steps=entry.get("progress_steps", 0),
+            last_progress_step=entry.get("last_progress_step", 0)
+        )
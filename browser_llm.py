@@ -0,0 +1,32 @@
+from browser_use import ChatGoogle
+from rate_limiter import is_rate_limited, rate_limiter
+from transcript import estimate_tokens
+import asyncio
+
+
+class RateLimitedChatGoogle(ChatGoogle):
+    # Browser agent steps share the process-wide quota with the structured calls
+    max_rate_limit_retries = 5
+
+    def _get_client_params(self) -> dict:
+        from google.genai import types
+
+        # The retries below are the only ones, SDK retries would hit the API again while the limiter counts one call
+        http_options = types.HttpOptions.model_validate(self.http_options or {})
+        return {**super()._get_client_params(), "http_options": http_options.model_copy(update={"retry_options": types.HttpRetryOptions(attempts=1)})}
+
+    async def ainvoke(self, messages, output_format=None):
+        tokens = sum(estimate_tokens(message.text) for message in messages) # Text only, screenshots are not counted
+        attempt = 0
+
+        while True:
+            try:
+                async with rate_limiter.slot_async(tokens) as lease:
+                    completion = await super().ainvoke(messages, output_format)
+                    lease["tokens_used"] = completion.usage.total_tokens if completion.usage else None
+                return completion
+            except Exception as e:
+                attempt += 1
+                if not is_rate_limited(e) or attempt > self.max_rate_limit_retries:
+                    raise # Other failures are counted by the browser agent itself
+                await asyncio.sleep(rate_limiter.backoff(attempt, e))
@@ -0,0 +1,165 @@
+from contextlib import asynccontextmanager
+from resource_governor import MB, ResourceGovernor, chromium_rss_mb
+from tracing import get_logger
+from typing import TYPE_CHECKING, Callable
+import asyncio
+import time
+
+if TYPE_CHECKING:
+    from browser_use import Browser
+
+logger = get_logger(__name__)
+
+
+class BrowserPool:
+    max_browsers: int
+    recycle_after: int
+    max_rss_mb: float | None
+    browsers: dict[int, "Browser"]
+    uses: dict[int, int]
+    last_used: dict[int, float]
+    in_use: set[int]
+    download_listeners: list[Callable[[int, str, str], None]]
+    governor: ResourceGovernor
+
+    def __init__(self, max_browsers: int, recycle_after: int = 10, max_rss_mb: float | None = 2048, root: str = ".", global_slots=None,
+                 governor: ResourceGovernor | None = None, disk_cache_mb: int | None = 64):
+        self.governor = governor or ResourceGovernor()
+        self.max_browsers = self.governor.capacity(max_browsers) # Cap on live Chromium instances, lowered when the host cannot fit them
+        if self.max_browsers < max_browsers:
+            logger.warning(f"Only {self.max_browsers} of {max_browsers} browsers fit in {self.governor.available_mb():.0f} MB of available memory")
+        self.disk_cache_mb = disk_cache_mb # Per browser, keeps profiles from growing between prunes
+        self.root = root # Profiles and downloads live under the project's workspace root
+        self.global_slots = global_slots # Optional multiprocessing semaphore shared by every project in a batch
+        self.recycle_after = recycle_after # Work cycles before a browser is restarted
+        self.max_rss_mb = max_rss_mb # Restart a browser once its process tree grows past this
+        self.browsers = {}
+        self.uses = {}
+        self.last_used = {}
+        self.in_use = set()
+        self.semaphore = asyncio.Semaphore(self.max_browsers)
+        self.download_listeners = [] # Called with (agent_id, url, path) for every finished download, off the event loop
+
+    def profile_dir(self, agent_id: int) -> str:
+        return f"{self.root}/agent-profile-{agent_id}"
+
+    def downloads_dir(self, agent_id: int) -> str:
+        return f"{self.root}/file_system_{agent_id}"
+
+    async def acquire_global_slot(self):
+        if self.global_slots is None or self.global_slots.acquire(block=False):
+            return
+
+        # Every slot is held, possibly by this project's own idle browsers, so give those back whenever they appear while waiting
+        while True:
+            for agent_id in sorted((agent for agent in self.browsers if agent not in self.in_use), key=lambda agent: self.last_used[agent]):
+                await self.discard(agent_id)
+
+            if await asyncio.to_thread(self.global_slots.acquire, True, 1.0): # Short waits keep the worker thread from outliving a cancelled lease for long
+                return
+
+    def new_browser(self, agent_id: int) -> "Browser":
+        from browser_use import Browser # browser_use pulls in its whole LLM and CDP stack, only processes that drive browsers pay for it
+        from browser_use.browser.events import FileDownloadedEvent
+
+        browser = Browser(
+            downloads_path=self.downloads_dir(agent_id),
+            window_size={'width': 1280, 'height': 800},
+            user_data_dir=self.profile_dir(agent_id),
+            args=[f"--disk-cache-size={self.disk_cache_mb * MB}"] if self.disk_cache_mb is not None else [],
+            keep_alive=True # BrowserAgent.run must not close a pooled browser
+        )
+
+        async def on_download(event: FileDownloadedEvent):
+            for listener in list(self.download_listeners):
+                try:
+                    await asyncio.to_thread(listener, agent_id, event.url, event.path) # Hashing a large download must not stall the other agents
+                except Exception as e:
+                    logger.warning(f"Download listener failed for {event.url}: {e}")
+
+        browser.event_bus.on(FileDownloadedEvent, on_download)
+        return browser
+
+    async def acquire(self, agent_id: int) -> "Browser":
+        await self.semaphore.acquire()
+
+        try:
+            if agent_id not in self.browsers:
+                idle = sorted((agent for agent in self.browsers if agent not in self.in_use), key=lambda agent: self.last_used[agent])
+                while (len(self.browsers) >= self.max_browsers or not self.governor.headroom()) and idle:
+                    await self.discard(idle.pop(0)) # Make room by closing the least recently used idle browser
+
+                await self.governor.admit(agent_id, self.profile_dir(agent_id), new_browser=True)
+                await self.acquire_global_slot()
+                await asyncio.to_thread(self.governor.prune, agent_id, self.profile_dir(agent_id)) # Profiles left by an earlier run
+                self.browsers[agent_id] = self.new_browser(agent_id)
+                self.uses[agent_id] = 0
+            else:
+                await self.governor.admit(agent_id, self.profile_dir(agent_id), new_browser=False)
+        except BaseException:
+            await self.governor.release(agent_id, self.profile_dir(agent_id))
+            self.semaphore.release()
+            raise
+
+        self.in_use.add(agent_id)
+        self.uses[agent_id] += 1
+        return self.browsers[agent_id]
+
+    async def release(self, agent_id: int, crashed: bool = False):
+        self.in_use.discard(agent_id)
+        self.last_used[agent_id] = time.monotonic()
+
+        try:
+            await self.governor.release(agent_id, self.profile_dir(agent_id))
+            if crashed:
+                logger.info(f"Recycling browser for agent {agent_id} after a crash")
+                await self.discard(agent_id)
+            elif self.uses[agent_id] >= self.recycle_after:
+                logger.info(f"Recycling browser for agent {agent_id} after {self.uses[agent_id]} work cycles")
+                await self.discard(agent_id)
+            else:
+                rss_mb = await asyncio.to_thread(chromium_rss_mb, self.profile_dir(agent_id)) # Scans the whole process table
+                if rss_mb is None or (self.max_rss_mb is not None and rss_mb > self.max_rss_mb):
+                    logger.info(f"Recycling browser for agent {agent_id} (rss: {rss_mb} MB)")
+                    await self.discard(agent_id)
+                elif await asyncio.to_thread(self.governor.profile_too_large, self.profile_dir(agent_id)):
+                    logger.info(f"Recycling browser for agent {agent_id} to prune its profile")
+                    await self.discard(agent_id)
+        finally:
+            self.semaphore.release()
+
+    @asynccontextmanager
+    async def lease(self, agent_id: int):
+        browser = await self.acquire(agent_id)
+        crashed = False
+
+        try:
+            yield browser
+        except BaseException:
+            crashed = True
+            raise
+        finally:
+            await self.release(agent_id, crashed=crashed)
+
+    async def discard(self, agent_id: int):
+        browser = self.browsers.pop(agent_id, None)
+        self.uses.pop(agent_id, None)
+        if browser is None:
+            return
+
+        try:
+            await browser.kill()
+        except Exception as e:
+            logger.warning(f"Failed to kill browser for agent {agent_id}: {e}")
+        finally:
+            if self.global_slots is not None:
+                self.global_slots.release()
+
+        await asyncio.to_thread(self.governor.prune, agent_id, self.profile_dir(agent_id))
+
+    async def close(self):
+        for agent_id in list(self.browsers):
+            await self.discard(agent_id)
+
+        if self.governor.footprints:
+            logger.info("Browser footprint per agent:\n" + self.governor.report())
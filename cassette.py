@@ -0,0 +1,39 @@
+from threading import Lock
+import json
+import os
+
+
+class Cassette:
+    # Calls are matched by key ("Discussion:2") and per-key sequence number, not by prompt text,
+    # so a replay still lines up after orchestration changes alter the prompts
+    path: str
+    entries: dict[str, list[dict]]
+
+    def __init__(self, path: str):
+        self.path = path
+        self.entries = {}
+        self.positions = {}
+        self.lock = Lock()
+
+        if os.path.isfile(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self.entries.setdefault(entry["key"], []).append(entry)
+
+    def append(self, entry: dict):
+        with self.lock:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, default=str) + "\n")
+
+    def next(self, key: str) -> dict:
+        with self.lock:
+            position = self.positions.get(key, 0)
+            recorded = self.entries.get(key, [])
+            if position >= len(recorded):
+                raise LookupError(f"Cassette {self.path} has no recording #{position} for {key}")
+
+            self.positions[key] = position + 1
+            return recorded[position]
@@ -0,0 +1,32 @@
+import gzip
+import json
+import os
+
+CHECKPOINT_VERSION = 3
+
+
+def write_checkpoint(path: str, state: dict):
+    # Gzipped JSON written to a temp file and renamed, so a crash mid-write keeps the previous checkpoint
+    data = gzip.compress(json.dumps({"version": CHECKPOINT_VERSION, **state}, separators=(",", ":")).encode("utf-8"))
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+
+    temp_path = os.path.join(directory, f".tmp-{os.path.basename(path)}")
+    with open(temp_path, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+
+def read_checkpoint(path: str) -> dict | None:
+    if not os.path.isfile(path):
+        return None
+
+    with open(path, "rb") as f:
+        state = json.loads(gzip.decompress(f.read()))
+
+    if state.get("version") != CHECKPOINT_VERSION:
+        raise ValueError(f"Checkpoint {path} has version {state.get('version')}, expected {CHECKPOINT_VERSION}")
+
+    return state
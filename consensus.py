@@ -0,0 +1,92 @@
+from collections import deque
+from dataclasses import dataclass
+import re
+
+CONSENSUS_RULES = ["unanimous", "majority", "stable"]
+
+
+def normalize(text: str) -> str:
+    return re.sub(r"\W+", " ", text.lower()).strip()
+
+
+def plan_key(assignments: dict[str, str], dependencies: dict[str, list[str]]) -> tuple:
+    # Re-punctuating or re-casing the same task list is not a change of plan
+    return (
+        tuple(sorted((agent.strip(), normalize(task)) for agent, task in assignments.items())),
+        tuple(sorted((agent.strip(), tuple(sorted(depends_on))) for agent, depends_on in dependencies.items() if depends_on))
+    )
+
+
+@dataclass
+class Ballot:
+    agent_id: int
+    agree: bool
+    complete: bool
+    assignments: dict[str, str]
+    dependencies: dict[str, list[str]]
+    plan: tuple
+
+
+class Consensus:
+    # Decides when a brainstorm or discussion has converged. Only the latest turn of each agent in a sliding
+    # window counts, so an early "yes" cannot carry a later disagreement and a single "no" does not wipe out
+    # everyone else's agreement. A plan that stops changing for `stable_turns` turns also ends the phase.
+    rule: str
+    window: deque[Ballot]
+    turns: int
+    outcome: str | None
+
+    def __init__(self, total_agents: int, rule: str = "unanimous", stable_turns: int | None = None, turn_limit: int | None = None):
+        assert rule in CONSENSUS_RULES, f"{rule} is not a supported consensus rule"
+        self.total_agents = total_agents
+        self.rule = rule
+        self.stable_turns = stable_turns or total_agents # Identical plans in a row that end the phase
+        self.turn_limit = turn_limit
+        self.window = deque(maxlen=max(total_agents, self.stable_turns))
+        self.turns = 0
+        self.outcome = None # agreed, stable, complete or limit once the phase should end
+
+    def record(self, agent_id: int, agree: bool, assignments: dict[str, str], dependencies: dict[str, list[str]], complete: bool = False):
+        self.turns += 1
+        self.window.append(Ballot(agent_id, agree, complete, assignments, dependencies, plan_key(assignments, dependencies)))
+
+    def latest_ballots(self) -> list[Ballot]:
+        # Most recent ballot of every agent among the last `total_agents` turns
+        latest = {}
+        for ballot in list(self.window)[-self.total_agents:]:
+            latest[ballot.agent_id] = ballot
+        return list(latest.values())
+
+    def decide(self) -> str | None:
+        ballots = self.latest_ballots()
+        everyone = len(ballots) == self.total_agents
+        agreeing = sum(ballot.agree for ballot in ballots)
+        recent = list(self.window)[-self.stable_turns:]
+
+        if everyone and all(ballot.complete for ballot in ballots):
+            self.outcome = "complete" # Finishing the project always needs every agent
+        elif self.rule == "unanimous" and everyone and agreeing == self.total_agents:
+            self.outcome = "agreed"
+        elif self.rule == "majority" and agreeing * 2 > self.total_agents:
+            self.outcome = "agreed"
+        elif len(recent) == self.stable_turns and len({ballot.plan for ballot in recent}) == 1:
+            self.outcome = "stable" # Further turns would only re-propose the same assignments
+        elif self.turn_limit is not None and self.turns >= self.turn_limit:
+            self.outcome = "limit"
+
+        return self.outcome
+
+    def confirming(self) -> bool:
+        # The last turn agreed to a plan, so the next one most likely only confirms it
+        return bool(self.window) and self.window[-1].agree
+
+    def plan(self) -> tuple[dict[str, str], dict[str, list[str]]]:
+        ballot = self.window[-1]
+        return ballot.assignments, ballot.dependencies
+
+    def turns_saved(self) -> int:
+        # Turns left under the limit when the phase converged before reaching it
+        return max(self.turn_limit - self.turns, 0) if self.turn_limit is not None and self.outcome != "limit" else 0
+
+    def stats(self) -> dict:
+        return {"rule": self.rule, "outcome": self.outcome, "turns": self.turns, "turns_saved": self.turns_saved()}
@@ -0,0 +1,117 @@
+from hashlib import sha256
+from tracing import get_logger
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from google.genai import types
+
+logger = get_logger(__name__)
+
+
+class ContextCache:
+    # Holds the stable prompt prefix of a phase so every turn only sends its own payload
+    hits: int
+    misses: int
+    entries: dict[tuple[str, str], str | None]
+    sizes: dict[str, int]
+    inline: bool = False
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.entries = {}
+        self.sizes = {} # cache name -> characters of the cached prefix
+
+    @staticmethod
+    def key(model: str, prefix: str) -> tuple[str, str]:
+        return model, sha256(prefix.encode("utf-8")).hexdigest()
+
+    def create(self, model: str, prefix: str) -> str | None:
+        raise NotImplementedError
+
+    def delete(self, name: str):
+        pass
+
+    def register(self, model: str, prefix: str) -> str | None:
+        key = self.key(model, prefix)
+        if key not in self.entries:
+            self.entries[key] = self.create(model, prefix)
+            if self.entries[key] is not None:
+                self.sizes[self.entries[key]] = len(prefix)
+
+        return self.entries[key]
+
+    def apply(self, model: str, prefix: str, suffix: str, config: "types.GenerateContentConfig") -> str:
+        # Returns the contents to send, pointing `config` at the cached prefix when there is one
+        cached = self.key(model, prefix) in self.entries
+        name = self.register(model, prefix)
+
+        if name is None:
+            self.misses += 1 # Prefix could not be cached and is paid for on every call
+            return prefix + suffix
+
+        if cached:
+            self.hits += 1
+        else:
+            self.misses += 1
+
+        if self.inline:
+            return prefix + suffix
+
+        config.cached_content = name
+        return suffix
+
+    def clear(self):
+        for name in self.entries.values():
+            if name is not None:
+                self.delete(name)
+
+        self.entries = {}
+        self.sizes = {}
+
+    def stats(self) -> dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self.entries)}
+
+
+class LocalContextCache(ContextCache):
+    # Offline stand-in for tests: keeps the hit/miss accounting, and inlines the prefix unless told otherwise
+    def __init__(self, inline: bool = True):
+        super().__init__()
+        self.inline = inline
+
+    def create(self, model: str, prefix: str) -> str | None:
+        return f"local/{self.key(model, prefix)[1][:16]}"
+
+
+class GeminiContextCache(ContextCache):
+    ttl_seconds: int
+
+    def __init__(self, client, ttl_seconds: int = 1800):
+        super().__init__()
+        self.client = client
+        self.ttl_seconds = ttl_seconds
+
+    def create(self, model: str, prefix: str) -> str | None:
+        from google.genai import types
+
+        try:
+            cache = self.client.caches.create(
+                model=model,
+                config=types.CreateCachedContentConfig(
+                    contents=[prefix],
+                    ttl=f"{self.ttl_seconds}s",
+                    display_name=f"agent-collab-{self.key(model, prefix)[1][:16]}"
+                )
+            )
+
+            return cache.name
+        except Exception as e:
+            # Prefixes below the model's minimum cacheable size are rejected, so they are sent inline instead
+            logger.info(f"Could not cache prefix for {model}, sending it inline: {e}")
+            return None
+
+    def delete(self, name: str):
+        try:
+            self.client.caches.delete(name=name)
+        except Exception as e:
+            logger.warning(f"Failed to delete {name}: {e}")
@@ -0,0 +1,110 @@
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from os import stat
+from threading import Lock
+from typing import TYPE_CHECKING
+import asyncio
+
+if TYPE_CHECKING:
+    from file_store import FileStore
+
+MAX_PDF_PAGES = 15
+MAX_TEXT_LINES = 1000
+
+
+class Document:
+    num_pages: int
+    pages: dict[int, str]
+    lines: list[str] | None
+
+    def __init__(self, num_pages: int = 0, lines: list[str] | None = None):
+        self.num_pages = num_pages
+        self.pages = {}
+        self.lines = lines
+
+
+class DocumentReader:
+    # Shared by every agent so a file read by one agent is free for the others until it changes on disk
+    max_entries: int
+    max_cached_text_bytes: int
+    cache: OrderedDict[tuple[str, int, int], Document]
+
+    def __init__(self, max_entries: int = 64, max_cached_text_bytes: int = 4 * 1024 * 1024, max_workers: int = 4):
+        self.max_entries = max_entries
+        self.max_cached_text_bytes = max_cached_text_bytes # Larger text files are streamed instead of cached
+        self.cache = OrderedDict()
+        self.lock = Lock()
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="document-reader")
+
+    @staticmethod
+    def key(path: str) -> tuple[str, int, int]:
+        info = stat(path)
+        return path, info.st_size, info.st_mtime_ns
+
+    def get(self, key: tuple[str, int, int]) -> Document | None:
+        with self.lock:
+            document = self.cache.get(key)
+            if document is not None:
+                self.cache.move_to_end(key)
+
+            return document
+
+    def put(self, key: tuple[str, int, int], document: Document):
+        with self.lock:
+            self.cache[key] = document
+            self.cache.move_to_end(key)
+            while len(self.cache) > self.max_entries:
+                self.cache.popitem(last=False)
+
+    def read_pdf(self, path: str, start_page: int = 0, max_pages: int = MAX_PDF_PAGES) -> tuple[str, int]:
+        import pypdf # Only loaded once an agent actually opens a PDF
+
+        key = self.key(path)
+        document = self.get(key)
+        reader = None
+
+        if document is None:
+            reader = pypdf.PdfReader(path)
+            document = Document(num_pages=len(reader.pages))
+            self.put(key, document)
+
+        end_page = min(start_page + max_pages, document.num_pages)
+        missing = [i for i in range(start_page, end_page) if i not in document.pages]
+        if missing:
+            reader = reader or pypdf.PdfReader(path)
+            for i in missing:
+                document.pages[i] = reader.pages[i].extract_text()
+
+        return "".join(document.pages[i] for i in range(start_page, end_page)), document.num_pages
+
+    def read_text(self, path: str, start_line: int = 0, max_lines: int = MAX_TEXT_LINES) -> tuple[str, int | None]:
+        key = self.key(path)
+        document = self.get(key)
+
+        if document is None and key[1] <= self.max_cached_text_bytes:
+            with open(path, "r", encoding="utf-8") as f:
+                document = Document(lines=f.readlines())
+            self.put(key, document)
+
+        if document is None:
+            with open(path, "r", encoding="utf-8") as f:
+                lines = list(islice(f, start_line, start_line + max_lines + 1)) # One extra line tells us if there is more
+            total_lines = None if len(lines) > max_lines else start_line + len(lines)
+            return "".join(lines[:max_lines]), total_lines
+
+        return "".join(document.lines[start_line:start_line + max_lines]), len(document.lines)
+
+    async def read_pdf_async(self, path: str, start_page: int = 0, max_pages: int = MAX_PDF_PAGES) -> tuple[str, int]:
+        # Extraction is CPU bound, so it runs off the event loop shared by every BrowserAgent
+        return await asyncio.get_running_loop().run_in_executor(self.executor, self.read_pdf, path, start_page, max_pages)
+
+    async def read_text_async(self, path: str, start_line: int = 0, max_lines: int = MAX_TEXT_LINES) -> tuple[str, int | None]:
+        return await asyncio.get_running_loop().run_in_executor(self.executor, self.read_text, path, start_line, max_lines)
+
+    async def read_text_versioned(self, file_store: "FileStore", path: str, start_line: int = 0, max_lines: int = MAX_TEXT_LINES) -> tuple[tuple[str, int | None], int]:
+        # Reads under the file's lock, paired with the version a later compare-and-swap write must match
+        return await asyncio.get_running_loop().run_in_executor(self.executor, file_store.read_with, path, lambda path: self.read_text(path, start_line, max_lines))
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,177 @@
+from os.path import abspath, dirname, basename
+from threading import Lock
+from typing import Callable, TypeVar
+import os
+import re
+import tempfile
+
+T = TypeVar("T")
+
+HUNK_HEADER = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+
+
+class VersionConflict(Exception):
+    pass
+
+
+class PatchError(Exception):
+    pass
+
+
+def parse_unified_diff(diff: str) -> list[tuple[int, int, list[str], list[str]]]:
+    hunks = []
+    hunk = None
+
+    for line in diff.splitlines():
+        header = HUNK_HEADER.match(line)
+        if header:
+            old_start = int(header.group(1))
+            old_count = int(header.group(2)) if header.group(2) is not None else 1
+            hunk = (old_start, old_count, [], [])
+            hunks.append(hunk)
+        elif hunk is None:
+            continue # Preamble such as `diff --git`, `---` and `+++` lines; inside a hunk those are changed lines
+        elif line.startswith("\\"):
+            continue # "\ No newline at end of file"
+        elif line.startswith("-"):
+            hunk[2].append(line[1:])
+        elif line.startswith("+"):
+            hunk[3].append(line[1:])
+        else:
+            context = line[1:] if line.startswith(" ") else line # Some models drop the leading space on blank context lines
+            hunk[2].append(context)
+            hunk[3].append(context)
+
+    if not hunks:
+        raise PatchError("No hunks found, the diff must contain `@@ -start,count +start,count @@` headers")
+
+    return hunks
+
+
+def apply_unified_diff(contents: str, diff: str) -> str:
+    lines = contents.splitlines()
+    trailing_newline = contents.endswith("\n") or not contents
+    result = []
+    position = 0
+
+    for old_start, old_count, old_lines, new_lines in parse_unified_diff(diff):
+        expected = min(old_start if old_count == 0 else old_start - 1, len(lines)) # A line number past the end is searched for from the end
+        index = None
+
+        # The header line number is only a hint; search outwards from it for the hunk's context
+        for offset in range(len(lines) + 1):
+            for candidate in (expected - offset, expected + offset):
+                if position <= candidate <= len(lines) - len(old_lines) and lines[candidate:candidate + len(old_lines)] == old_lines:
+                    index = candidate
+                    break
+            if index is not None:
+                break
+
+        if index is None:
+            raise PatchError(f"Hunk starting at line {old_start} does not match the current file contents")
+
+        result += lines[position:index] + new_lines
+        position = index + len(old_lines)
+
+    result += lines[position:]
+    return "\n".join(result) + ("\n" if trailing_newline and result else "")
+
+
+class FileStore:
+    # Every tool edit goes through here so concurrent agents cannot lose each other's updates
+    locks: dict[str, Lock]
+    versions: dict[str, int]
+    listeners: list[Callable[[str, str | None, int | None], None]]
+
+    def __init__(self):
+        self.locks = {}
+        self.versions = {}
+        self.registry_lock = Lock()
+        self.listeners = [] # Called with (path, contents, author) after every successful write, contents is None for links
+
+    def lock(self, path: str) -> Lock:
+        with self.registry_lock:
+            return self.locks.setdefault(abspath(path), Lock())
+
+    def version(self, path: str) -> int:
+        return self.versions.get(abspath(path), 1 if os.path.isfile(path) else 0)
+
+    def check_version(self, path: str, expected_version: int | None):
+        if expected_version is not None and expected_version != self.version(path):
+            raise VersionConflict(f"{basename(path)} is at version {self.version(path)}, not {expected_version}")
+
+    def commit(self, path: str, contents: str, author: int | None = None) -> int:
+        # Write to a temporary file next to the target and rename it over, so readers never see half a file
+        fd, temp_path = tempfile.mkstemp(dir=dirname(abspath(path)), prefix=".tmp-", suffix=".part")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(contents)
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+        return self.committed(path, contents, author)
+
+    def committed(self, path: str, contents: str | None, author: int | None) -> int:
+        version = self.version(path) + 1
+        self.versions[abspath(path)] = version
+
+        for listener in self.listeners:
+            listener(path, contents, author)
+
+        return version
+
+    def read(self, path: str) -> tuple[str, int]:
+        def read_all(path: str) -> str:
+            with open(path, "r", encoding="utf-8") as f:
+                return f.read()
+
+        return self.read_with(path, read_all)
+
+    def read_with(self, path: str, reader: Callable[[str], T]) -> tuple[T, int]:
+        # Contents and the version they belong to, so a compare-and-swap write based on them cannot pass on stale contents
+        with self.lock(path):
+            return reader(path), self.version(path)
+
+    def write(self, path: str, contents: str, author: int | None = None) -> int:
+        with self.lock(path):
+            return self.commit(path, contents, author)
+
+    def link(self, path: str, place: Callable[[str], None], author: int | None = None) -> int:
+        # `place` puts existing contents at the path by reference (see BlobStore) instead of writing them
+        with self.lock(path):
+            place(path)
+            return self.committed(path, None, author)
+
+    def append(self, path: str, contents: str, author: int | None = None) -> int:
+        with self.lock(path):
+            existing = ""
+            if os.path.isfile(path):
+                with open(path, "r", encoding="utf-8") as f:
+                    existing = f.read()
+
+            return self.commit(path, existing + contents, author)
+
+    def replace(self, path: str, old_str: str, new_str: str, expected_version: int | None = None, author: int | None = None) -> tuple[int, int]:
+        with self.lock(path):
+            self.check_version(path, expected_version)
+
+            with open(path, "r", encoding="utf-8") as f:
+                contents = f.read()
+
+            count = contents.count(old_str)
+            if count == 0:
+                return 0, self.version(path)
+
+            return count, self.commit(path, contents.replace(old_str, new_str), author)
+
+    def patch(self, path: str, diff: str, expected_version: int | None = None, author: int | None = None) -> int:
+        with self.lock(path):
+            self.check_version(path, expected_version)
+
+            with open(path, "r", encoding="utf-8") as f:
+                contents = f.read()
+
+            return self.commit(path, apply_unified_diff(contents, diff), author)
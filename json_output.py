@@ -3,10 +3,18 @@ from pydantic import BaseModel
 class Brainstorm(BaseModel):
     message_to_team: str
     subtask_assignments: dict[str, str]
+    subtask_dependencies: dict[str, list[str]] = {} # Agent name -> agents whose subtasks must finish first
     vote: bool
 
 class Discuss(BaseModel):
     message_to_team: str
     subtask_assignments: dict[str, str]
+    subtask_dependencies: dict[str, list[str]] = {}
     end_discussion_vote: bool
-    complete_project_vote: bool
\ No newline at end of file
+    complete_project_vote: bool
+
+class Replan(BaseModel):
+    message_to_team: str
+    next_task: str
+    depends_on: list[str] = [] # Agents whose current subtasks must finish before next_task starts
+    wait_for_team: bool
\ No newline at end of file
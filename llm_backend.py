@@ -0,0 +1,116 @@
+from cassette import Cassette
+from collections import Counter
+from context_cache import ContextCache, GeminiContextCache, LocalContextCache
+from hashlib import sha256
+from transcript import estimate_tokens
+from types import SimpleNamespace
+from typing import TYPE_CHECKING
+import json
+
+if TYPE_CHECKING:
+    from google.genai import types # Imported on first use, the SDK's type models take seconds to load
+
+
+def contents_text(contents) -> str:
+    return contents if isinstance(contents, str) else json.dumps(contents, default=str)
+
+
+class LLMBackend:
+    # Every structured model call goes through a backend so runs can be recorded and replayed offline
+    def generate(self, model: str, contents, config: "types.GenerateContentConfig | None", key: str):
+        raise NotImplementedError
+
+    async def generate_async(self, model: str, contents, config: "types.GenerateContentConfig | None", key: str):
+        return self.generate(model, contents, config, key)
+
+    def context_cache(self) -> ContextCache:
+        return LocalContextCache()
+
+
+class GeminiBackend(LLMBackend):
+    def __init__(self, client=None):
+        self._client = client
+
+    @property
+    def client(self):
+        if self._client is None:
+            from google import genai
+            self._client = genai.Client() # Created on first use so importing this module needs no API key
+        return self._client
+
+    def generate(self, model: str, contents, config: "types.GenerateContentConfig | None", key: str):
+        return self.client.models.generate_content(model=model, contents=contents, config=config)
+
+    async def generate_async(self, model: str, contents, config: "types.GenerateContentConfig | None", key: str):
+        return await self.client.aio.models.generate_content(model=model, contents=contents, config=config)
+
+    def context_cache(self) -> ContextCache:
+        return GeminiContextCache(self.client)
+
+
+def response_entry(key: str, model: str, contents, response) -> dict:
+    usage = getattr(response, "usage_metadata", None)
+    parsed = getattr(response, "parsed", None)
+
+    return {
+        "key": key,
+        "model": model,
+        "prompt_sha256": sha256(contents_text(contents).encode("utf-8")).hexdigest(),
+        "text": response.text,
+        "parsed": parsed.model_dump() if hasattr(parsed, "model_dump") else parsed,
+        "usage": {
+            "prompt_token_count": usage.prompt_token_count,
+            "cached_content_token_count": usage.cached_content_token_count,
+            "candidates_token_count": usage.candidates_token_count
+        } if usage is not None else None
+    }
+
+
+class RecordingBackend(LLMBackend):
+    def __init__(self, inner: LLMBackend, path: str):
+        self.inner = inner
+        self.cassette = Cassette(path)
+
+    def generate(self, model: str, contents, config: "types.GenerateContentConfig | None", key: str):
+        response = self.inner.generate(model, contents, config, key)
+        self.cassette.append(response_entry(key, model, contents, response))
+        return response
+
+    async def generate_async(self, model: str, contents, config: "types.GenerateContentConfig | None", key: str):
+        response = await self.inner.generate_async(model, contents, config, key)
+        self.cassette.append(response_entry(key, model, contents, response))
+        return response
+
+    def context_cache(self) -> ContextCache:
+        return self.inner.context_cache()
+
+
+class ReplayBackend(LLMBackend):
+    calls: int
+    calls_by_model: Counter[str]
+
+    def __init__(self, path: str):
+        self.cassette = Cassette(path)
+        self.calls = 0
+        self.calls_by_model = Counter() # Shows where a model router sent the calls
+        self.cache = LocalContextCache(inline=False) # Behaves like server-side caching so token counts match a live run
+
+    def generate(self, model: str, contents, config: "types.GenerateContentConfig | None", key: str):
+        entry = self.cassette.next(key)
+        self.calls += 1
+        self.calls_by_model[model] += 1
+
+        # Token counts describe the prompt actually built in this run, not the recorded one
+        cached_tokens = self.cache.sizes.get(config.cached_content, 0) // 4 if config is not None and config.cached_content else 0
+        usage = SimpleNamespace(
+            prompt_token_count=estimate_tokens(contents_text(contents)) + cached_tokens,
+            cached_content_token_count=cached_tokens,
+            candidates_token_count=estimate_tokens(entry["text"] or "")
+        )
+        return SimpleNamespace(text=entry["text"], parsed=entry["parsed"], usage_metadata=usage)
+
+    def context_cache(self) -> ContextCache:
+        return self.cache
+
+
+default_backend = GeminiBackend() # Shared by agents and projects that are not given a backend explicitly
@@ -0,0 +1,182 @@
+from dataclasses import asdict, dataclass
+from hashlib import sha256
+from os.path import abspath, basename, dirname
+from threading import Lock
+import os
+
+
+@dataclass
+class FileEntry:
+    path: str
+    size: int
+    mtime_ns: int
+    sha256: str
+    author: str
+    iteration: int
+    generation: int
+
+
+def hash_file(path: str) -> str:
+    digest = sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+
+    return digest.hexdigest()
+
+
+def is_hidden(name: str) -> bool:
+    return name.startswith(".") # .gitkeep and FileStore's in-flight temp files
+
+
+class WorkspaceManifest:
+    # Tracks every workspace file so discussions only hear about what changed
+    directories: dict[str, str]
+    owners: dict[str, int | None]
+    entries: dict[str, FileEntry]
+    removed: dict[str, int]
+    generation: int
+
+    def __init__(self):
+        self.directories = {} # directory -> label shown in prompts
+        self.owners = {} # directory -> agent that owns it, used as the author of browser downloads
+        self.entries = {}
+        self.removed = {} # path -> generation it disappeared in
+        self.generation = 0
+        self.lock = Lock()
+
+    def add_directory(self, directory: str, label: str, owner: int | None = None):
+        self.directories[abspath(directory)] = label
+        self.owners[abspath(directory)] = owner
+
+    def state(self) -> dict:
+        with self.lock:
+            return {
+                "entries": [asdict(entry) for entry in self.entries.values()],
+                "removed": self.removed,
+                "generation": self.generation
+            }
+
+    def restore(self, state: dict):
+        # Files changed on disk after the checkpoint show up as changes on the next reconcile
+        with self.lock:
+            self.entries = {entry["path"]: FileEntry(**entry) for entry in state["entries"]}
+            self.removed = dict(state["removed"])
+            self.generation = state["generation"]
+
+    def record(self, path: str, contents: str | bytes | None, author: str, iteration: int):
+        # Linked files have no contents at hand and are hashed from disk
+        path = abspath(path)
+        data = contents.encode("utf-8") if isinstance(contents, str) else contents
+        digest = sha256(data).hexdigest() if data is not None else hash_file(path)
+        info = os.stat(path)
+
+        with self.lock:
+            self.entries[path] = FileEntry(
+                path=path,
+                size=info.st_size,
+                mtime_ns=info.st_mtime_ns,
+                sha256=digest,
+                author=author,
+                iteration=iteration,
+                generation=self.generation
+            )
+            self.removed.pop(path, None)
+
+    def reconcile(self, iteration: int) -> int:
+        # Cheap stat diff; files are only re-hashed when their size or mtime moved
+        seen = set()
+        changed = 0
+
+        for directory in self.directories:
+            if not os.path.isdir(directory):
+                continue
+
+            with os.scandir(directory) as scan:
+                for item in scan:
+                    if is_hidden(item.name) or not item.is_file():
+                        continue
+
+                    path = abspath(item.path)
+                    seen.add(path)
+                    info = item.stat()
+                    entry = self.entries.get(path)
+
+                    if entry is not None and entry.size == info.st_size and entry.mtime_ns == info.st_mtime_ns:
+                        continue
+
+                    digest = hash_file(path)
+                    with self.lock:
+                        if entry is not None and entry.sha256 == digest:
+                            entry.size, entry.mtime_ns = info.st_size, info.st_mtime_ns # Touched but not modified
+                            continue
+
+                        owner = self.owners[directory]
+                        self.entries[path] = FileEntry(
+                            path=path,
+                            size=info.st_size,
+                            mtime_ns=info.st_mtime_ns,
+                            sha256=digest,
+                            author=f"Agent_{owner} (browser)" if owner is not None else "unknown",
+                            iteration=iteration,
+                            generation=self.generation
+                        )
+                        self.removed.pop(path, None)
+                        changed += 1
+
+        with self.lock:
+            for path in [path for path in self.entries if path not in seen]:
+                del self.entries[path]
+                self.removed[path] = self.generation
+                changed += 1
+
+        return changed
+
+    def advance(self) -> int:
+        # Starts a new generation; changes made after this call are reported by changes_since(returned value)
+        with self.lock:
+            self.generation += 1
+            return self.generation
+
+    def changes_since(self, generation: int) -> tuple[list[FileEntry], list[str]]:
+        with self.lock:
+            changed = [entry for entry in self.entries.values() if entry.generation >= generation]
+            removed = [path for path, removed_generation in self.removed.items() if removed_generation >= generation]
+
+        return changed, removed
+
+    def render_changes(self, generation: int, agents: set[int] | None = None, private: bool = True) -> str:
+        # With `agents`, only their private folders and their changes to shared folders are listed in detail,
+        # without `private` only the shared folders are listed
+        changed, removed = self.changes_since(generation)
+        names = {f"Agent_{agent_id}" for agent_id in agents} if agents is not None else None
+        lines = []
+
+        for directory, label in self.directories.items():
+            owner = self.owners.get(directory)
+            if owner is not None and (not private or (agents is not None and owner not in agents)):
+                continue
+
+            directory_changed = sorted((entry for entry in changed if dirname(entry.path) == directory), key=lambda entry: basename(entry.path))
+            directory_removed = sorted(basename(path) for path in removed if dirname(path) == directory)
+            unchanged = sum(1 for path in self.entries if dirname(path) == directory) - len(directory_changed)
+            others = ""
+            if names is not None:
+                in_scope = [entry for entry in directory_changed if entry.author.split(" ")[0] in names] # Authors look like "Agent_3 (browser)"
+                if len(in_scope) < len(directory_changed):
+                    others = f", {len(directory_changed) - len(in_scope)} changed by other sub-teams"
+                directory_changed = in_scope
+
+            if not directory_changed and not directory_removed:
+                lines.append(f"{label}: no changes ({unchanged} files{others})")
+                continue
+
+            lines.append(f"{label}:")
+            for entry in directory_changed:
+                lines.append(f"  * {basename(entry.path)} ({entry.size} bytes, by {entry.author}, iteration {entry.iteration})")
+            for name in directory_removed:
+                lines.append(f"  - {name} (deleted)")
+            if unchanged or others:
+                lines.append(f"  ({unchanged} unchanged files{others})")
+
+        return "\n".join(lines)
@@ -0,0 +1,52 @@
+from dataclasses import dataclass, field
+import json
+
+# Call types with their own route. "<type>.confirm" is a brainstorm or discussion turn taken while a plan another
+# agent agreed to is on the table, so it most likely only confirms it. Without a route of its own it uses "<type>".
+CALL_TYPES = ["Brainstorm", "Brainstorm.confirm", "Discussion", "Discussion.confirm", "Replan", "Summary", "Work"]
+
+
+@dataclass
+class ModelRouter:
+    # Models for each call type in fallback order, the next one is tried after an error or a timeout
+    default: list[str]
+    routes: dict[str, list[str]] = field(default_factory=dict)
+    timeout_s: float | None = None # Per model call
+
+    def models(self, call_type: str) -> list[str]:
+        while call_type:
+            if call_type in self.routes:
+                return self.routes[call_type]
+            call_type = call_type.rpartition(".")[0]
+
+        return self.default
+
+    def model(self, call_type: str, attempt: int = 0) -> str:
+        # The last model of a route takes every remaining retry
+        models = self.models(call_type)
+        return models[min(attempt, len(models) - 1)]
+
+    @classmethod
+    def from_config(cls, config: dict, default_model: str) -> "ModelRouter":
+        # {"default": "gemini-2.5-flash", "routes": {"Brainstorm": ["gemini-2.5-pro", "gemini-2.5-flash"]}, "timeout_s": 60}
+        # A single model can be given as a string instead of a list
+        def model_list(models) -> list[str]:
+            models = [models] if isinstance(models, str) else list(models)
+            if not models:
+                raise ValueError("A model route needs at least one model")
+            return models
+
+        unknown = set(config.get("routes", {})) - set(CALL_TYPES)
+        if unknown:
+            raise ValueError(f"Unknown call types {sorted(unknown)} in model routes, expected some of {CALL_TYPES}")
+
+        return cls(
+            default=model_list(config.get("default", default_model)),
+            routes={call_type: model_list(models) for call_type, models in config.get("routes", {}).items()},
+            timeout_s=config.get("timeout_s")
+        )
+
+    @classmethod
+    def load(cls, path: str, default_model: str) -> "ModelRouter":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls.from_config(json.load(f), default_model)
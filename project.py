@@ -0,0 +1,935 @@
+from browser_backend import BrowserBackend, BrowserUseBackend
+from browser_pool import BrowserPool
+from checkpoint import read_checkpoint, write_checkpoint
+from consensus import Consensus
+from context_cache import ContextCache
+from llm_backend import LLMBackend, default_backend
+from model_router import ModelRouter
+from rate_limiter import rate_limiter
+from resource_governor import ResourceGovernor
+from response_cache import ResponseCache
+from prompts import AGENT_SYSTEM_PROMPT, AGENT_TRAITS, BRAINSTORM_PROMPT, DISCUSS_CONTEXT_PROMPT, DISCUSS_PROMPT, LEAD_ROLE_PROMPT, MEMBER_ROLE_PROMPT, REPLAN_PROMPT, SUMMARY_PROMPT
+from json_output import Brainstorm, Discuss, Replan
+from scheduler import ScheduledTask, TaskScheduler
+from step_budget import StepBudget
+from step_log import StepLog, WorkCycle
+from teams import SubTeam, form_teams
+from transcript import Transcript, Turn, estimate_tokens, summarize_turns
+from tracing import get_logger, record_usage, tracer
+from workspace import Workspace
+from time import sleep
+import asyncio
+
+logger = get_logger(__name__)
+
+TOTAL_AGENTS = 3
+
+
+def json_config(schema, timeout_s: float | None = None):
+    from google.genai import types # The SDK's type models take seconds to import, so only live calls pay for them
+    return types.GenerateContentConfig(
+        response_mime_type="application/json",
+        response_json_schema=schema.model_json_schema(),
+        http_options=types.HttpOptions(timeout=int(timeout_s * 1000)) if timeout_s is not None else None
+    )
+
+
+class Agent:
+    _id: int
+    agent_traits: str
+    system_prompt: str
+    tasks: list[str]
+    work_log: StepLog
+    llm_name: str
+    steps_per_work_cycle: int
+    step_budget: StepBudget
+    total_agents: int
+    llm_backend: LLMBackend
+    router: ModelRouter
+    response_cache: ResponseCache | None
+
+    def __init__(self, _id: int, agent_traits: str, llm_name: str, steps_per_work_cycle: int, total_agents: int = TOTAL_AGENTS, llm_backend: LLMBackend = default_backend,
+                 router: ModelRouter | None = None, response_cache: ResponseCache | None = None):
+        self._id = _id
+        self.agent_traits = agent_traits
+        self.total_agents = total_agents
+        self.system_prompt = AGENT_SYSTEM_PROMPT.substitute(
+            agent_id=self._id,
+            total_agents=self.total_agents,
+            agent_traits=self.agent_traits
+        )
+        self.tasks = []
+        self.work_log = StepLog() # One compact record per work cycle, aligned with tasks
+        self.llm_name = llm_name
+        self.steps_per_work_cycle = steps_per_work_cycle
+        self.step_budget = StepBudget(steps_per_work_cycle) # Steps and wall-clock deadline adapt to past work cycles
+        self.llm_backend = llm_backend # Live Gemini calls, or a recording/replaying cassette
+        self.router = router or ModelRouter(default=[llm_name]) # Model per call type, `llm_name` for all of them unless configured
+        self.response_cache = response_cache
+
+    def add_task(self, task: str):
+        self.tasks.append(task)
+
+    def get_id(self):
+        return self._id
+
+    def get_task_history(self):
+        return [self.tasks, self.work_log.cycles]
+
+    def state(self) -> dict:
+        return {"tasks": self.tasks, "work_log": self.work_log.state(), "step_budget": self.step_budget.state()}
+
+    def restore(self, state: dict):
+        self.tasks = state["tasks"]
+        self.work_log.restore(state["work_log"])
+        self.step_budget.restore(state["step_budget"])
+
+    def cache_key(self, prompt: str, schema, call_type: str) -> str | None:
+        # The whole prompt, including a prefix that may be sent as cached content, addresses the response
+        return self.response_cache.key(self.router.model(call_type), schema.__name__, prompt) if self.response_cache is not None else None
+
+    def cached(self, cache_key: str | None, schema, span: dict):
+        response = self.response_cache.get(cache_key) if cache_key is not None else None
+        if response is None:
+            return None
+
+        span["cache_hits"] = 1
+        return schema.model_validate(response)
+
+    def remember(self, cache_key: str | None, result):
+        # The response is already paid for, so failing to cache it must not fail the call
+        if cache_key is None:
+            return
+
+        try:
+            self.response_cache.put(cache_key, result.model_dump())
+        except Exception as e:
+            logger.warning(f"Failed to cache a response for Agent_{self._id}: {type(e).__name__}: {e}")
+
+    def _generate(self, prompt: str, schema, label: str, prefix: str = "", context_cache: ContextCache | None = None, confirm: bool = False):
+        call_type = f"{label}.confirm" if confirm else label
+        cache_key = self.cache_key(prefix + prompt, schema, call_type)
+        attempts = 0
+
+        with tracer.span("llm.generate_content", agent_id=self._id, label=label, call_type=call_type, model=self.router.model(call_type)) as span:
+            result = self.cached(cache_key, schema, span)
+            if result is not None:
+                return result
+
+            while attempts < 10:
+                model = self.router.model(call_type, attempts) # Falls back along the route after every failed attempt
+                span["model"] = model
+                try:
+                    config = json_config(schema, self.router.timeout_s)
+                    contents = context_cache.apply(model, prefix, prompt, config) if context_cache and prefix else prefix + prompt
+                    with rate_limiter.slot(estimate_tokens(prefix + prompt)) as lease:
+                        response = self.llm_backend.generate(model, contents, config, key=f"{label}:{self._id}")
+                        lease["tokens_used"] = getattr(response.usage_metadata, "total_token_count", None)
+                    record_usage(span, response)
+
+                    result = schema.model_validate(response.parsed)
+                    break
+                except Exception as e:
+                    attempts += 1
+                    span["retries"] = attempts
+                    logger.warning(f"(Attempt {attempts}) {label} for Agent_{self._id} on {model} failed with exception: {type(e).__name__}: {e}")
+                    sleep(rate_limiter.backoff(attempts, e))
+
+            if result is None:
+                span["failed"] = 1
+                return None
+
+            self.remember(cache_key, result)
+            return result
+
+    async def _generate_async(self, prompt: str, schema, label: str, prefix: str = "", context_cache: ContextCache | None = None, confirm: bool = False):
+        call_type = f"{label}.confirm" if confirm else label
+        cache_key = self.cache_key(prefix + prompt, schema, call_type)
+        attempts = 0
+
+        with tracer.span("llm.generate_content", agent_id=self._id, label=label, call_type=call_type, model=self.router.model(call_type)) as span:
+            result = self.cached(cache_key, schema, span)
+            if result is not None:
+                return result
+
+            while attempts < 10:
+                model = self.router.model(call_type, attempts) # Falls back along the route after every failed attempt
+                span["model"] = model
+                try:
+                    config = json_config(schema, self.router.timeout_s)
+                    contents = context_cache.apply(model, prefix, prompt, config) if context_cache and prefix else prefix + prompt
+                    async with rate_limiter.slot_async(estimate_tokens(prefix + prompt)) as lease:
+                        response = await asyncio.wait_for(
+                            self.llm_backend.generate_async(model, contents, config, key=f"{label}:{self._id}"),
+                            self.router.timeout_s
+                        )
+                        lease["tokens_used"] = getattr(response.usage_metadata, "total_token_count", None)
+                    record_usage(span, response)
+
+                    result = schema.model_validate(response.parsed)
+                    break
+                except Exception as e:
+                    attempts += 1
+                    span["retries"] = attempts
+                    logger.warning(f"(Attempt {attempts}) {label} for Agent_{self._id} on {model} failed with exception: {type(e).__name__}: {e}")
+                    await asyncio.sleep(rate_limiter.backoff(attempts, e)) # Does not block the other agents proposing in the same round
+
+            if result is None:
+                span["failed"] = 1
+                return None
+
+            self.remember(cache_key, result)
+            return result
+
+    def brainstorm_prompt(self, objective: str, current_conversation: str, role: str = "", group_size: int | None = None) -> str:
+        # In hierarchical mode `role` scopes the agent to its sub-team or to the leads, who plan in groups of `group_size`
+        return self.system_prompt + role + "\n---" + BRAINSTORM_PROMPT.substitute( # There is no built-in system prompt for structured output
+            objective=objective,
+            total_agents=group_size or self.total_agents,
+            current_conversation=current_conversation,
+            agent_id=self._id
+        )
+
+    def brainstorm(self, objective: str, current_conversation: str, role: str = "", group_size: int | None = None, confirm: bool = False):
+        return self._generate(self.brainstorm_prompt(objective, current_conversation, role, group_size), Brainstorm, "Brainstorm", confirm=confirm)
+
+    async def brainstorm_async(self, objective: str, current_conversation: str, role: str = "", group_size: int | None = None, confirm: bool = False):
+        return await self._generate_async(self.brainstorm_prompt(objective, current_conversation, role, group_size), Brainstorm, "Brainstorm", confirm=confirm)
+
+    async def work(self, browser_backend: BrowserBackend, workspace: Workspace):
+        task = self.tasks[-1]
+
+        max_steps = self.step_budget.steps()
+        deadline_s = self.step_budget.deadline_s()
+
+        with tracer.span("browser_agent.run", agent_id=self._id, step_budget=max_steps, deadline_s=deadline_s) as span:
+            try:
+                work_run = await browser_backend.run(self._id, task, self.router.model("Work"), max_steps, workspace, deadline_s)
+            except Exception as e:
+                self.work_log.append(WorkCycle(task=task, steps=[], stop_reason="failed", error=str(e))) # Keeps tasks and work cycles aligned for the task history
+                raise
+            span["steps_used"] = work_run.steps_used
+            span["errors"] = work_run.errors
+            span["progress_steps"] = work_run.progress_steps
+            span["stop_reason"] = work_run.stop_reason
+
+        self.step_budget.record(work_run)
+        self.work_log.append(WorkCycle(task=task, steps=work_run.steps, stop_reason=work_run.stop_reason))
+
+    def discuss_prompt(self, current_conversation: str, relevant_files: str, role: str = "", group_size: int | None = None) -> str:
+        # Only this part changes between turns, the shared phase context is sent (or cached) ahead of it
+        return self.system_prompt + role + "\n---" + DISCUSS_PROMPT.substitute(
+            # There is no built-in system prompt for structured output
+            total_agents=group_size or self.total_agents,
+            current_conversation=current_conversation,
+            relevant_files=relevant_files,
+            agent_id=self._id
+        )
+
+    def retrieval_query(self, objective: str) -> str:
+        return f"{objective}\n{self.tasks[-1]}" if self.tasks else objective
+
+    def discuss(self, context: str, current_conversation: str, relevant_files: str = "", context_cache: ContextCache | None = None, role: str = "", group_size: int | None = None, confirm: bool = False):
+        return self._generate(self.discuss_prompt(current_conversation, relevant_files, role, group_size), Discuss, "Discussion", prefix=context, context_cache=context_cache, confirm=confirm)
+
+    async def discuss_async(self, context: str, current_conversation: str, relevant_files: str = "", context_cache: ContextCache | None = None, role: str = "", group_size: int | None = None, confirm: bool = False):
+        return await self._generate_async(self.discuss_prompt(current_conversation, relevant_files, role, group_size), Discuss, "Discussion", prefix=context, context_cache=context_cache, confirm=confirm)
+
+    async def replan_async(self, objective: str, finished_task: str, finished_output: str, team_status: str, current_files: str, current_conversation: str):
+        return await self._generate_async(self.system_prompt + "\n---" + REPLAN_PROMPT.substitute(
+            objective=objective,
+            finished_task=finished_task,
+            finished_output=finished_output,
+            team_status=team_status,
+            current_files=current_files,
+            current_conversation=current_conversation,
+            agent_id=self._id
+        ), Replan, "Replan")
+
+
+def parse_agent_name(agent_name: str) -> int | None:
+    try:
+        return int(agent_name[6:])
+    except ValueError:
+        return None
+
+class Project:
+    agents: list[Agent]
+    objective: str
+    transcript: Transcript
+    max_iterations: int
+    iteration_number: int
+    parallel_rounds: bool
+    loop: asyncio.AbstractEventLoop
+    llm_backend: LLMBackend
+    browser_backend: BrowserBackend
+    context_cache: ContextCache
+    workspace: Workspace
+    files_generation: int
+    snippet_token_budget: int
+    task_history_token_budget: int
+    consensus_rule: str
+    stable_turns: int | None
+    team_size: int | None
+    teams: list[SubTeam]
+    team_transcripts: dict[int, Transcript]
+    completed: bool
+    scheduler: TaskScheduler | None
+    checkpoint_path: str | None
+    phases_completed: int
+    resource_governor: ResourceGovernor
+
+    def __init__(self,
+                 objective: str,
+                 max_iterations: int,
+                 parallel_rounds: bool = False,
+                 max_browsers: int = TOTAL_AGENTS,
+                 conversation_token_budget: int = 6000,
+                 recent_turns: int = TOTAL_AGENTS * 2,
+                 context_cache: ContextCache | None = None,
+                 snippet_token_budget: int = 1500,
+                 task_history_token_budget: int = 1500,
+                 trace_path: str | None = "./trace.jsonl",
+                 llm_backend: LLMBackend = default_backend,
+                 browser_backend: BrowserBackend | None = None,
+                 workspace_root: str = ".",
+                 dag_scheduling: bool = False,
+                 checkpoint_path: str | None = "./checkpoint.json.gz",
+                 browser_slots=None,
+                 consensus_rule: str = "unanimous",
+                 stable_turns: int | None = None,
+                 team_size: int | None = None,
+                 resource_governor: ResourceGovernor | None = None):
+        self.agents = []
+        self.objective = objective
+        self.transcript = Transcript(
+            token_budget=conversation_token_budget, # Prompts get "summary + last turns" instead of the whole conversation
+            recent_turns=recent_turns,
+            summarizer=self.summarize,
+            async_summarizer=self.summarize_async
+        )
+        self.max_iterations = max_iterations
+        self.iteration_number = 1
+        self.parallel_rounds = parallel_rounds # Every agent proposes at once each round instead of round-robin
+        self.loop = asyncio.new_event_loop() # Shared by every phase so async clients and browsers outlive a single phase
+        self.llm_backend = llm_backend
+        self.resource_governor = resource_governor or ResourceGovernor() # Admits browser runs by memory headroom and measures their footprint
+        self.browser_backend = browser_backend or BrowserUseBackend(BrowserPool(max_browsers=max_browsers, root=workspace_root, global_slots=browser_slots, governor=self.resource_governor)) # Warm browsers are reused across work cycles
+        self.context_cache = context_cache or self.llm_backend.context_cache()
+        self.workspace = Workspace(workspace_root) # File store and document cache shared by every agent's file tools
+        self.files_generation = 0 # Manifest generation of the last file listing shown to the agents
+        self.snippet_token_budget = snippet_token_budget # Per-agent budget for retrieved file excerpts in discuss prompts
+        self.task_history_token_budget = task_history_token_budget # Per-agent budget for the steps of its latest work cycle
+        self.completed = False # Set once every agent votes the project complete
+        self.scheduler = TaskScheduler(self.run_task, self.replan) if dag_scheduling else None # Tasks start as their dependencies finish instead of in lockstep
+        self.checkpoint_path = checkpoint_path # Written after every phase so a crashed run can be resumed
+        self.phases_completed = 0
+        self.consensus_rule = consensus_rule # unanimous, majority or stable, see Consensus
+        self.stable_turns = stable_turns # Turns proposing the same assignments that end a phase, one round by default
+        self.team_size = team_size # Hierarchical mode: sub-teams of this size plan internally, their leads plan together
+        self.teams = []
+        self.team_transcripts = {} # team id -> conversation of that sub-team, the leads talk in self.transcript
+        tracer.configure(trace_path)
+
+    def add_agent(self, agent: Agent):
+        self.agents.append(agent)
+        self.workspace.add_agent(agent.get_id())
+        if self.scheduler is not None:
+            self.scheduler.add_agent(agent.get_id())
+
+        if self.team_size is not None:
+            self.teams = form_teams([agent.get_id() for agent in self.agents], self.team_size)
+            self.team_transcripts = {
+                team.team_id: self.team_transcripts.get(team.team_id) or Transcript(
+                    token_budget=self.transcript.token_budget,
+                    recent_turns=self.team_size * 2,
+                    summarizer=self.summarize,
+                    async_summarizer=self.summarize_async
+                )
+                for team in self.teams
+            }
+
+    def summary_prompt(self, previous_summary: str, turns: list[Turn]) -> str:
+        return SUMMARY_PROMPT.substitute(
+            total_agents=len(self.agents),
+            objective=self.objective,
+            max_words=300,
+            previous_summary=previous_summary or "None",
+            turns="".join(f"Agent_{turn.agent_id}: {turn.render()}" for turn in turns)
+        )
+
+    def summarize(self, previous_summary: str, turns: list[Turn]) -> str:
+        if not turns:
+            return previous_summary
+
+        try:
+            model = self.agents[0].router.model("Summary")
+            with tracer.span("llm.generate_content", label="Summary", call_type="Summary", model=model) as span:
+                contents = self.summary_prompt(previous_summary, turns)
+                with rate_limiter.slot(estimate_tokens(contents)) as lease:
+                    response = self.llm_backend.generate(model, contents, None, key="Summary")
+                    lease["tokens_used"] = getattr(response.usage_metadata, "total_token_count", None)
+                record_usage(span, response)
+
+            return response.text
+        except Exception as e:
+            logger.warning(f"Summary of iteration {turns[-1].iteration} failed, using extractive summary: {e}")
+            return summarize_turns(previous_summary, turns)
+
+    async def summarize_async(self, previous_summary: str, turns: list[Turn]) -> str:
+        if not turns:
+            return previous_summary
+
+        try:
+            model = self.agents[0].router.model("Summary")
+            with tracer.span("llm.generate_content", label="Summary", call_type="Summary", model=model) as span:
+                contents = self.summary_prompt(previous_summary, turns)
+                async with rate_limiter.slot_async(estimate_tokens(contents)) as lease:
+                    response = await self.llm_backend.generate_async(model, contents, None, key="Summary")
+                    lease["tokens_used"] = getattr(response.usage_metadata, "total_token_count", None)
+                record_usage(span, response)
+
+            return response.text
+        except Exception as e:
+            logger.warning(f"Summary of iteration {turns[-1].iteration} failed, using extractive summary: {e}")
+            return summarize_turns(previous_summary, turns)
+
+    def record_turn(self, agent_id: int, result: Brainstorm | Discuss | Replan, consensus: Consensus | None = None, transcript: Transcript | None = None):
+        logger.debug(f"Conversation turn by Agent_{agent_id}: {result}")
+
+        if isinstance(result, Replan):
+            subtask_assignments = {f"Agent_{agent_id}": result.next_task}
+            votes = {"wait_for_team": result.wait_for_team}
+        else:
+            subtask_assignments = result.subtask_assignments
+            votes = {"vote": result.vote} if isinstance(result, Brainstorm) else {
+                "end_discussion_vote": result.end_discussion_vote,
+                "complete_project_vote": result.complete_project_vote
+            }
+        (transcript or self.transcript).add(Turn(
+            agent_id=agent_id,
+            iteration=self.iteration_number,
+            message=result.message_to_team,
+            subtask_assignments=subtask_assignments,
+            votes=votes
+        ))
+
+        if consensus is not None:
+            consensus.record(
+                agent_id,
+                agree=result.vote if isinstance(result, Brainstorm) else result.end_discussion_vote,
+                assignments=result.subtask_assignments,
+                dependencies=result.subtask_dependencies,
+                complete=isinstance(result, Discuss) and result.complete_project_vote
+            )
+
+    def consensus(self, turn_limit: int, total_agents: int | None = None) -> Consensus:
+        return Consensus(total_agents or len(self.agents), rule=self.consensus_rule, stable_turns=self.stable_turns, turn_limit=turn_limit)
+
+    def record_consensus(self, consensus: Consensus, scope: str = "team"):
+        logger.info(f"Consensus of the {scope} in iteration {self.iteration_number}: {consensus.stats()}")
+        tracer.add(consensus_turns=consensus.turns, turns_saved=consensus.turns_saved())
+
+    def conclude(self, consensus: Consensus):
+        self.record_consensus(consensus)
+
+        if consensus.outcome == "complete":
+            self.completed = True
+        else:
+            self.assign_tasks(*consensus.plan())
+
+    def assign_tasks(self, subtask_assignments: dict[str, str], subtask_dependencies: dict[str, list[str]] | None = None):
+        assignments = {}
+        for agent_name in subtask_assignments:
+            agent_id = parse_agent_name(agent_name)
+            if agent_id is None or not 0 <= agent_id < len(self.agents):
+                continue # output sometimes contains non-agents
+
+            assignments[agent_id] = subtask_assignments[agent_name]
+
+            logger.info(f"Assigned task for {agent_name}: {subtask_assignments[agent_name]}")
+
+        if self.scheduler is None:
+            for agent_id, task in assignments.items():
+                self.agents[agent_id].add_task(task)
+            return
+
+        dependencies = {
+            parse_agent_name(agent_name): [parse_agent_name(dependency) for dependency in depends_on]
+            for agent_name, depends_on in (subtask_dependencies or {}).items()
+        }
+        self.scheduler.submit_batch(assignments, dependencies)
+
+    def brainstorm(self):
+        if self.teams:
+            return self.brainstorm_teams()
+
+        consensus = self.consensus(turn_limit=len(self.agents) * 8)
+
+        if self.parallel_rounds:
+            self.loop.run_until_complete(self.brainstorm_parallel(consensus))
+            return self.conclude(consensus)
+
+        current_agent = 0
+
+        while consensus.decide() is None:
+            brainstorm_result = self.agents[current_agent].brainstorm(
+                objective=self.objective,
+                current_conversation=self.transcript.render(self.iteration_number),
+                confirm=consensus.confirming()
+            )
+
+            if brainstorm_result is None:
+                raise Exception(f"Brainstorming for Agent_{current_agent} failed")
+
+            self.record_turn(current_agent, brainstorm_result, consensus)
+            current_agent = current_agent + 1 if current_agent < len(self.agents) - 1 else 0
+
+        self.conclude(consensus)
+
+    async def brainstorm_parallel(self, consensus: Consensus):
+        while consensus.decide() is None:
+            current_conversation = await self.transcript.render_async(self.iteration_number)
+            confirm = consensus.confirming()
+            proposals = await asyncio.gather(*[
+                agent.brainstorm_async(objective=self.objective, current_conversation=current_conversation, confirm=confirm)
+                for agent in self.agents
+            ])
+            proposals = [(agent, proposal) for agent, proposal in zip(self.agents, proposals) if proposal is not None] # A failed agent sits the round out
+
+            if not proposals:
+                raise Exception("Brainstorming round failed for every agent")
+
+            for agent, brainstorm_result in proposals:
+                self.record_turn(agent.get_id(), brainstorm_result, consensus)
+
+    def work(self):
+        self.workspace.iteration = self.iteration_number
+
+        if self.scheduler is not None:
+            self.loop.run_until_complete(self.scheduler.run()) # Returns once every agent is idle
+            self.workspace.manifest.reconcile(self.iteration_number)
+            logger.info(f"Scheduler after iteration {self.iteration_number}: {self.scheduler.stats()}")
+            return
+
+        async def work_runner():
+            work = [agent.work(self.browser_backend, self.workspace) for agent in self.agents]
+            work_results = await asyncio.gather(*work, return_exceptions=True)
+
+            return work_results
+
+        completed_actions = self.loop.run_until_complete(work_runner())
+        for agent, result in zip(self.agents, completed_actions):
+            if isinstance(result, Exception):
+                logger.error(f"Work cycle of Agent_{agent.get_id()} failed: {result}") # Recorded in its work log, the team discusses it next
+        self.workspace.manifest.reconcile(self.iteration_number) # Picks up browser downloads
+
+    async def run_task(self, task: ScheduledTask):
+        agent = self.agents[task.agent_id]
+        agent.add_task(task.description)
+
+        await agent.work(self.browser_backend, self.workspace)
+
+    def team_status(self, agent_id: int) -> str:
+        status = ""
+        for agent in self.agents:
+            if agent.get_id() == agent_id:
+                continue
+            if agent.get_id() in self.scheduler.active:
+                status += f"Agent_{agent.get_id()} is working on: {self.scheduler.active[agent.get_id()].description}\n"
+            elif agent.get_id() in self.scheduler.pending:
+                status += f"Agent_{agent.get_id()} is about to start: {self.scheduler.pending[agent.get_id()].description}\n"
+            else:
+                status += f"Agent_{agent.get_id()} is idle until the next team discussion\n"
+
+        return status
+
+    async def replan(self, task: ScheduledTask) -> tuple[str, list[int]] | None:
+        # Lightweight alternative to a team discussion for an agent that finished before its teammates
+        agent = self.agents[task.agent_id]
+        result = await agent.replan_async(
+            objective=self.objective,
+            finished_task=task.description,
+            finished_output=agent.work_log.latest().render(self.task_history_token_budget),
+            team_status=self.team_status(task.agent_id),
+            current_files=self.workspace.manifest.render_changes(self.files_generation),
+            current_conversation=await self.transcript.render_async(self.iteration_number)
+        )
+        if result is None:
+            return None
+
+        self.record_turn(task.agent_id, result)
+        if result.wait_for_team:
+            return None
+
+        logger.info(f"Agent_{task.agent_id} re-planned its next task: {result.next_task}")
+        return result.next_task, [agent_id for agent_id in map(parse_agent_name, result.depends_on) if agent_id is not None]
+
+    def task_history(self, agent_ids: list[int]) -> str:
+        full_agent_task_history = ""
+        for agent in [self.agents[agent_id] for agent_id in agent_ids]:
+            executed_tasks, work_cycles = agent.get_task_history()
+            assert len(executed_tasks) == len(work_cycles), f"agent {agent.get_id()}'s tasks: {len(executed_tasks), executed_tasks}, work cycles: {len(work_cycles)}" # Sanity check
+            full_agent_task_history += f"Agent_{agent.get_id()}'s completed tasks and task outputs:\n"
+            for i in range(len(executed_tasks)):
+                full_agent_task_history += f"Description of task {i} of Agent_{agent.get_id()}: {executed_tasks[i]}\n\n"
+            full_agent_task_history += f"\nActions completed for task {len(executed_tasks) - 1} of Agent_{agent.get_id()}:\n{work_cycles[-1].render(self.task_history_token_budget)}\n---\n\n"
+            # We add all previous task descriptions + actions for most recent task to context
+
+        return full_agent_task_history
+
+    def discuss(self):
+        if self.teams:
+            return self.discuss_teams()
+
+        consensus = self.consensus(turn_limit=len(self.agents) * 8)
+        current_agent = 0
+
+        full_agent_task_history = self.task_history([agent.get_id() for agent in self.agents])
+        logger.debug("Task history:\n" + full_agent_task_history)
+
+        self.workspace.manifest.reconcile(self.iteration_number)
+        current_files = self.workspace.manifest.render_changes(self.files_generation)
+        self.files_generation = self.workspace.manifest.advance()
+
+        self.workspace.retrieval_index.sync(self.workspace.manifest) # Only files whose hash changed are re-indexed
+        relevant_files = {
+            agent.get_id(): self.workspace.retrieval_index.render(agent.retrieval_query(self.objective), token_budget=self.snippet_token_budget)
+            for agent in self.agents
+        }
+
+        logger.debug("Files:\n" + current_files)
+
+        context = DISCUSS_CONTEXT_PROMPT.substitute(
+            objective=self.objective,
+            task_history=full_agent_task_history,
+            current_files=current_files,
+            max_iterations=self.max_iterations,
+            current_iteration=self.iteration_number
+        )
+        for llm_name in {agent.router.model("Discussion") for agent in self.agents}:
+            self.context_cache.register(llm_name, context) # The big history block is uploaded once per phase
+
+        try:
+            if self.parallel_rounds:
+                self.loop.run_until_complete(self.discuss_parallel(context=context, relevant_files=relevant_files, consensus=consensus))
+                return self.conclude(consensus)
+
+            while consensus.decide() is None:
+                discuss_result = self.agents[current_agent].discuss(
+                    context=context,
+                    current_conversation=self.transcript.render(self.iteration_number),
+                    relevant_files=relevant_files[current_agent],
+                    context_cache=self.context_cache,
+                    confirm=consensus.confirming()
+                )
+
+                if discuss_result is None:
+                    raise Exception(f"Discussion for Agent_{current_agent} failed")
+
+                self.record_turn(current_agent, discuss_result, consensus)
+                current_agent = current_agent + 1 if current_agent < len(self.agents) - 1 else 0
+
+            self.conclude(consensus)
+        finally:
+            logger.info(f"Context cache for iteration {self.iteration_number}: {self.context_cache.stats()}")
+            self.context_cache.clear()
+
+    async def discuss_parallel(self, context: str, relevant_files: dict[int, str], consensus: Consensus):
+        while consensus.decide() is None:
+            current_conversation = await self.transcript.render_async(self.iteration_number)
+            confirm = consensus.confirming()
+            proposals = await asyncio.gather(*[
+                agent.discuss_async(
+                    context=context,
+                    current_conversation=current_conversation,
+                    relevant_files=relevant_files[agent.get_id()],
+                    context_cache=self.context_cache,
+                    confirm=confirm
+                )
+                for agent in self.agents
+            ])
+            proposals = [(agent, proposal) for agent, proposal in zip(self.agents, proposals) if proposal is not None] # A failed agent sits the round out
+
+            if not proposals:
+                raise Exception(f"Discussion round {consensus.turns // len(self.agents)} failed for every agent")
+
+            for agent, discuss_result in proposals:
+                self.record_turn(agent.get_id(), discuss_result, consensus)
+
+    def lead_role(self, team: SubTeam) -> str:
+        return LEAD_ROLE_PROMPT.substitute(
+            team_name=team.name,
+            team_members=", ".join(sorted(team.member_names())),
+            leads=", ".join(f"Agent_{other.lead}" for other in self.teams)
+        )
+
+    def member_role(self, team: SubTeam) -> str:
+        return MEMBER_ROLE_PROMPT.substitute(
+            team_name=team.name,
+            team_members=", ".join(sorted(team.member_names())),
+            lead=team.lead,
+            team_objective=team.objective or self.objective
+        )
+
+    def team_overview(self) -> str:
+        # What the leads see instead of every agent's full task history: one line per agent
+        overview = ""
+        for team in self.teams:
+            overview += f"{team.name} (lead Agent_{team.lead}), objective: {team.objective}\n"
+            for agent in [self.agents[agent_id] for agent_id in team.members]:
+                cycle = agent.work_log.latest()
+                if cycle is not None:
+                    overview += f"- Agent_{agent.get_id()}: {cycle.task}\n  Outcome: {cycle.outline()}\n"
+            overview += "---\n"
+        return overview
+
+    async def converse(self, speakers: list[Agent], transcript: Transcript, propose, label: str) -> Consensus:
+        # Round-robin turns among one group of agents, the leads or a sub-team
+        consensus = self.consensus(turn_limit=len(speakers) * 8, total_agents=len(speakers))
+        current = 0
+
+        while consensus.decide() is None:
+            agent = speakers[current]
+            result = await propose(agent, await transcript.render_async(self.iteration_number), consensus.confirming())
+
+            if result is None:
+                raise Exception(f"{label} for Agent_{agent.get_id()} failed")
+
+            # Assignments for agents outside the group are dropped, they would only inflate everyone's transcript
+            scope = {f"Agent_{speaker.get_id()}" for speaker in speakers}
+            result = result.model_copy(update={
+                "subtask_assignments": {name.strip(): task for name, task in result.subtask_assignments.items() if name.strip() in scope},
+                "subtask_dependencies": {name.strip(): [dependency for dependency in depends_on if dependency in scope] for name, depends_on in result.subtask_dependencies.items() if name.strip() in scope}
+            })
+            self.record_turn(agent.get_id(), result, consensus, transcript)
+            current = current + 1 if current < len(speakers) - 1 else 0
+
+        return consensus
+
+    def plan_teams(self, consensus: Consensus):
+        self.record_consensus(consensus, "leads")
+        if consensus.outcome == "complete":
+            self.completed = True
+            return
+
+        team_objectives, _ = consensus.plan()
+        for team in self.teams:
+            team.objective = team_objectives.get(f"Agent_{team.lead}") or team.objective or self.objective
+            logger.info(f"Objective for {team.name}: {team.objective}")
+
+    async def plan_within_teams(self, propose):
+        # Sub-teams only talk among themselves, so they plan concurrently
+        consensuses = await asyncio.gather(*[
+            self.converse(
+                [self.agents[agent_id] for agent_id in team.members],
+                self.team_transcripts[team.team_id],
+                lambda agent, conversation, confirm, team=team: propose(team, agent, conversation, confirm),
+                f"Planning in {team.name}"
+            )
+            for team in self.teams
+        ])
+
+        assignments = {}
+        dependencies = {}
+        for team, consensus in zip(self.teams, consensuses):
+            self.record_consensus(consensus, team.name)
+            team_assignments, team_dependencies = consensus.plan()
+            for name in sorted(team.member_names()):
+                assignments[name] = team_assignments.get(name) or team.objective # A member left out of the plan works on the team objective
+            dependencies.update(team_dependencies) # Already limited to the team by converse()
+
+        self.assign_tasks(assignments, dependencies)
+
+    def brainstorm_teams(self):
+        leads = [self.agents[team.lead] for team in self.teams]
+        team_of = {team.lead: team for team in self.teams}
+
+        consensus = self.loop.run_until_complete(self.converse(
+            leads,
+            self.transcript,
+            lambda agent, conversation, confirm: agent.brainstorm_async(self.objective, conversation, role=self.lead_role(team_of[agent.get_id()]), group_size=len(leads), confirm=confirm),
+            "Brainstorming"
+        ))
+        self.plan_teams(consensus)
+        if self.completed:
+            return
+
+        self.loop.run_until_complete(self.plan_within_teams(
+            lambda team, agent, conversation, confirm: agent.brainstorm_async(self.objective, conversation, role=self.member_role(team), group_size=len(team.members), confirm=confirm)
+        ))
+
+    def discuss_teams(self):
+        leads = [self.agents[team.lead] for team in self.teams]
+        team_of = {team.lead: team for team in self.teams}
+
+        self.workspace.manifest.reconcile(self.iteration_number)
+        lead_context = DISCUSS_CONTEXT_PROMPT.substitute(
+            objective=self.objective,
+            task_history=self.team_overview(),
+            current_files=self.workspace.manifest.render_changes(self.files_generation, private=False),
+            max_iterations=self.max_iterations,
+            current_iteration=self.iteration_number
+        )
+        team_contexts = {
+            team.team_id: DISCUSS_CONTEXT_PROMPT.substitute(
+                objective=self.objective,
+                task_history=self.task_history(team.members),
+                current_files=self.workspace.manifest.render_changes(self.files_generation, agents=set(team.members)),
+                max_iterations=self.max_iterations,
+                current_iteration=self.iteration_number
+            )
+            for team in self.teams
+        }
+        self.files_generation = self.workspace.manifest.advance()
+
+        self.workspace.retrieval_index.sync(self.workspace.manifest)
+        relevant_files = {
+            agent.get_id(): self.workspace.retrieval_index.render(agent.retrieval_query(self.objective), token_budget=self.snippet_token_budget)
+            for agent in self.agents
+        }
+
+        for llm_name in {agent.router.model("Discussion") for agent in self.agents}:
+            for context in [lead_context, *team_contexts.values()]:
+                self.context_cache.register(llm_name, context)
+
+        try:
+            consensus = self.loop.run_until_complete(self.converse(
+                leads,
+                self.transcript,
+                lambda agent, conversation, confirm: agent.discuss_async(
+                    context=lead_context,
+                    current_conversation=conversation,
+                    relevant_files=relevant_files[agent.get_id()],
+                    context_cache=self.context_cache,
+                    role=self.lead_role(team_of[agent.get_id()]),
+                    group_size=len(leads),
+                    confirm=confirm
+                ),
+                "Discussion"
+            ))
+            self.plan_teams(consensus)
+            if self.completed:
+                return
+
+            self.loop.run_until_complete(self.plan_within_teams(
+                lambda team, agent, conversation, confirm: agent.discuss_async(
+                    context=team_contexts[team.team_id],
+                    current_conversation=conversation,
+                    relevant_files=relevant_files[agent.get_id()],
+                    context_cache=self.context_cache,
+                    role=self.member_role(team),
+                    group_size=len(team.members),
+                    confirm=confirm
+                )
+            ))
+        finally:
+            logger.info(f"Context cache for iteration {self.iteration_number}: {self.context_cache.stats()}")
+            self.context_cache.clear()
+
+    def close(self):
+        self.loop.run_until_complete(self.browser_backend.close())
+        self.loop.close()
+        self.workspace.close()
+        logger.info("Run summary:\n" + tracer.summary())
+        logger.info(f"Rate limiter: {rate_limiter.stats()}")
+        tracer.close()
+
+    def run_phase(self, phase: str):
+        with tracer.span(f"project.{phase}", iteration=self.iteration_number):
+            getattr(self, phase)()
+
+    def phases(self) -> list[tuple[str, int]]:
+        return [("brainstorm", 1), ("work", 1)] + [(phase, iteration) for iteration in range(2, self.max_iterations + 1) for phase in ("discuss", "work")]
+
+    def state(self) -> dict:
+        return {
+            "objective": self.objective,
+            "phases_completed": self.phases_completed,
+            "iteration_number": self.iteration_number,
+            "files_generation": self.files_generation,
+            "completed": self.completed,
+            "transcript": self.transcript.state(),
+            "agents": {str(agent.get_id()): agent.state() for agent in self.agents},
+            "manifest": self.workspace.manifest.state(),
+            "scheduled_tasks": self.scheduler.state() if self.scheduler is not None else {},
+            "teams": {str(team.team_id): {"objective": team.objective, "transcript": self.team_transcripts[team.team_id].state()} for team in self.teams}
+        }
+
+    def checkpoint(self):
+        if self.checkpoint_path is not None:
+            with tracer.span("project.checkpoint", iteration=self.iteration_number):
+                write_checkpoint(self.checkpoint_path, self.state())
+
+    def resume(self) -> bool:
+        state = read_checkpoint(self.checkpoint_path) if self.checkpoint_path is not None else None
+        if state is None:
+            logger.warning(f"No checkpoint found at {self.checkpoint_path}, starting from the beginning")
+            return False
+
+        if state["objective"] != self.objective or set(state["agents"]) != {str(agent.get_id()) for agent in self.agents} or set(state["teams"]) != {str(team.team_id) for team in self.teams}:
+            raise ValueError(f"Checkpoint {self.checkpoint_path} belongs to a different project or team")
+
+        self.phases_completed = state["phases_completed"]
+        self.iteration_number = state["iteration_number"]
+        self.files_generation = state["files_generation"]
+        self.completed = state["completed"]
+        self.transcript.restore(state["transcript"])
+        for agent in self.agents:
+            agent.restore(state["agents"][str(agent.get_id())])
+        self.workspace.manifest.restore(state["manifest"])
+        if self.scheduler is not None:
+            self.scheduler.restore(state["scheduled_tasks"])
+        for team in self.teams:
+            team.objective = state["teams"][str(team.team_id)]["objective"]
+            self.team_transcripts[team.team_id].restore(state["teams"][str(team.team_id)]["transcript"])
+
+        logger.info(f"Resuming after phase {self.phases_completed} of {len(self.phases())} (iteration {self.iteration_number})")
+        return True
+
+    def execute(self):
+        try:
+            for index, (phase, iteration) in enumerate(self.phases()):
+                if self.completed:
+                    break # Agents voted the project complete, no further work cycle
+                if index < self.phases_completed:
+                    continue # Already done before the checkpoint this run resumed from
+
+                self.iteration_number = iteration
+                self.run_phase(phase)
+                self.phases_completed = index + 1
+                self.checkpoint()
+        finally:
+            self.close()
+
+        print(f"The project objective \"{self.objective}\" has been completed after {self.iteration_number - 1} iterations of work.")
+
+
+def build_project(objective: str,
+                  max_iterations: int = 6,
+                  total_agents: int = TOTAL_AGENTS,
+                  llm_name: str = "gemini-2.5-flash",
+                  steps_per_work_cycle: int = 50,
+                  llm_backend: LLMBackend = default_backend,
+                  traits: list[str] | None = None,
+                  router: ModelRouter | None = None,
+                  response_cache: ResponseCache | None = None,
+                  **project_options) -> Project:
+    project_options.setdefault("recent_turns", total_agents * 2) # The Project defaults are sized for TOTAL_AGENTS
+    project_options.setdefault("max_browsers", total_agents)
+    project = Project(objective=objective, max_iterations=max_iterations, llm_backend=llm_backend, **project_options)
+    traits = traits or AGENT_TRAITS # Assigned round-robin, so any number of agents can share a few traits
+
+    for i in range(total_agents):
+        project.add_agent(Agent(
+            _id=i,
+            agent_traits=traits[i % len(traits)],
+            llm_name=llm_name,
+            steps_per_work_cycle=steps_per_work_cycle,
+            total_agents=total_agents,
+            llm_backend=llm_backend,
+            router=router,
+            response_cache=response_cache
+        ))
+
+    return project
@@ -18,6 +18,18 @@ Information Regarding Files:
  - **Private files**: Accessible only to the agent that created them. Use these when the information does not need to be shared with other agents or shown to the user.
  - **Collaborative files**: Accessible to all agents. Use these when information needs to be visible or editable by the entire group (e.g., drafts for a group report).
  - **Output files**: Visible to the user and accessible to all agents. Use these for final results, reports, or other content intended for direct presentation.
+ - Downloads are shared: an agent can publish a private file to the collaborative or output files without rewriting it, and reuse a file another agent already downloaded from the same URL.
+""")
+
+LEAD_ROLE_PROMPT = Template("""
+Your Role: You lead $team_name ($team_members). You plan together with the other team leads ($leads) only. The subtask you assign to a lead is the objective of that lead's whole sub-team for the next round of work, which the sub-team then splits among its members, so use the lead agent names as the keys of your subtask assignments and dependencies.
+""")
+
+MEMBER_ROLE_PROMPT = Template("""
+Your Role: You are a member of $team_name ($team_members), led by Agent_$lead. The team leads have set your team's objective for this round of work:
+$team_objective
+
+Plan only within your team: split your team's objective among its members, and only use your team members' names as the keys of your subtask assignments and dependencies.
 """)
 
 BRAINSTORM_PROMPT = Template("""
@@ -49,7 +61,7 @@ Brainstorm how to approach this project. Consider:
 - If any platforms or websites are specified in the project goal and are relevant to subtasks, add them to the subtask description.
 - Not everything needs to be completed within a given work round.
 
-Your response will contain a message containing your ideas to the team, a dictionaries of size $total_agents with agent name as the key and a detailed overview of their assigned subtask as the value, as well as a vote to decide if no further brainstorming is required. Vote true to finish brainstorming and vote false to continue brainstorming.
+Your response will contain a message containing your ideas to the team, a dictionaries of size $total_agents with agent name as the key and a detailed overview of their assigned subtask as the value, as well as a vote to decide if no further brainstorming is required. Vote true to finish brainstorming and vote false to continue brainstorming. Optionally, add a dictionary of subtask dependencies with agent name as the key and a list of the agent names whose current subtasks must be finished before that agent starts; leave it empty when the subtasks can run in parallel.
 
 ---
 
@@ -58,7 +70,7 @@ Conversation so far:
 $current_conversation
 """)
 
-DISCUSS_PROMPT = Template("""
+DISCUSS_CONTEXT_PROMPT = Template("""
 Project Goal: $objective
 
 You have $max_iterations rounds of discussion and work to achieve the goal. You are currently on round $current_iteration. No work can be completed beyond the final round. Please manage your time accordingly.
@@ -70,8 +82,15 @@ $task_history
 
 ---
 
-Current Files:
-$current_files:
+Files Changed Since The Last Discussion:
+$current_files
+
+---
+""")
+
+DISCUSS_PROMPT = Template("""
+Excerpts From Collaborative And Output Files Relevant To Your Work:
+$relevant_files
 
 ---
 
@@ -101,11 +120,68 @@ Tips:
 - If any platforms or websites are specified in the project goal and are relevant to subtasks, add them to the subtask description.
 - Not everything needs to be completed within a given work round.
 
-Your response will contain a message containing your ideas to the team, a dictionaries of size $total_agents with agent name as the key and a detailed overview of their assigned subtask as the value, a vote to decide if no further discussion is required, and a vote to decide if the project has been completed. Vote true to finish discussing / complete the project and vote false to continue discussing / continue the project.
+Your response will contain a message containing your ideas to the team, a dictionaries of size $total_agents with agent name as the key and a detailed overview of their assigned subtask as the value, a vote to decide if no further discussion is required, and a vote to decide if the project has been completed. Vote true to finish discussing / complete the project and vote false to continue discussing / continue the project. Optionally, add a dictionary of subtask dependencies with agent name as the key and a list of the agent names whose current subtasks must be finished before that agent starts; leave it empty when the subtasks can run in parallel.
 
 ---
 
 Conversation so far:
 
 $current_conversation
-""")
\ No newline at end of file
+""")
+
+REPLAN_PROMPT = Template("""
+Project Goal: $objective
+
+You just finished your subtask while some of your teammates are still working. Instead of waiting for a full team discussion, decide what you should do next on your own.
+
+Your Finished Subtask:
+$finished_task
+
+What You Did:
+$finished_output
+
+---
+
+Team Status:
+$team_status
+
+---
+
+Files Changed Since The Last Discussion:
+$current_files
+
+---
+
+Choose your next subtask:
+- Continue with work that does not conflict with what your teammates are currently doing.
+- If your next subtask needs results from a teammate who is still working, list that agent in depends_on and it will start once they finish.
+- If there is nothing useful you can do until the team discusses the results, set wait_for_team to true.
+
+Your response will contain a short message to the team (start it with "Agent_$agent_id:"), a detailed description of your next subtask, the names of agents whose current subtasks must finish before it starts, and whether you should wait for the next team discussion instead.
+
+---
+
+Conversation so far:
+
+$current_conversation
+""")
+
+SUMMARY_PROMPT = Template("""
+You are summarizing the planning discussion of a team of $total_agents autonomous agents working on a group project.
+
+Project Goal: $objective
+
+Write a concise summary (at most $max_words words) that merges the previous summary with the new discussion turns below. Keep decisions that were agreed on, the final subtask assignment of each agent, open issues, and any feedback on completed work. Drop greetings, repetition, and ideas that were abandoned.
+
+---
+
+Previous summary:
+
+$previous_summary
+
+---
+
+New discussion turns:
+
+$turns
+""")
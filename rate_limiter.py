@@ -0,0 +1,209 @@
+from contextlib import asynccontextmanager, contextmanager
+from threading import Lock
+from tracing import get_logger, tracer
+import asyncio
+import random
+import re
+import time
+
+RETRY_DELAY = re.compile(r"retryDelay['\"]?\s*[:=]\s*['\"]?(\d+(?:\.\d+)?)s") # google.rpc.RetryInfo in Gemini 429 details
+
+logger = get_logger(__name__)
+
+
+def error_chain(error: BaseException | None):
+    while error is not None:
+        yield error
+        error = error.__cause__ or error.__context__
+
+
+def is_rate_limited(error: BaseException) -> bool:
+    for cause in error_chain(error):
+        code = getattr(cause, "code", None) or getattr(cause, "status_code", None) # google.genai APIError / browser_use ModelProviderError
+        if code == 429 or "RESOURCE_EXHAUSTED" in str(cause):
+            return True
+
+    return False
+
+
+def retry_after(error: BaseException) -> float | None:
+    # Server hint from a Retry-After header or the RetryInfo detail, whichever the error carries
+    for cause in error_chain(error):
+        headers = getattr(getattr(cause, "response", None), "headers", None)
+        if headers is not None and headers.get("retry-after"):
+            try:
+                return float(headers.get("retry-after"))
+            except ValueError:
+                pass
+
+        match = RETRY_DELAY.search(str(cause))
+        if match:
+            return float(match.group(1))
+
+    return None
+
+
+class TokenBucket:
+    capacity: float
+    level: float
+    rate: float
+
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.level = per_minute
+        self.rate = per_minute / 60
+        self.updated = time.monotonic()
+
+    def refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait(self, amount: float) -> float:
+        amount = min(amount, self.capacity) # A single oversized call must still be able to go through
+        return 0 if self.level >= amount else (amount - self.level) / self.rate
+
+
+class RateLimiter:
+    # Process-wide gate for every Gemini call: request and token buckets, a shared cooldown after 429s
+    # and an AIMD concurrency limit, so agents back off together instead of retrying in lockstep
+    requests: TokenBucket | None
+    tokens: TokenBucket | None
+    limit: float
+    in_flight: int
+    paused_until: float
+
+    def __init__(self,
+                 requests_per_minute: float | None = 1000,
+                 tokens_per_minute: float | None = 1_000_000,
+                 max_concurrency: int = 16,
+                 min_concurrency: int = 1,
+                 base_backoff_s: float = 1.0,
+                 max_backoff_s: float = 60.0):
+        self.lock = Lock()
+        self.configure(requests_per_minute, tokens_per_minute, max_concurrency, min_concurrency, base_backoff_s, max_backoff_s)
+
+    def configure(self,
+                  requests_per_minute: float | None = 1000,
+                  tokens_per_minute: float | None = 1_000_000,
+                  max_concurrency: int = 16,
+                  min_concurrency: int = 1,
+                  base_backoff_s: float = 1.0,
+                  max_backoff_s: float = 60.0,
+                  shared_slots=None):
+        with self.lock:
+            self.shared_slots = shared_slots # Optional multiprocessing semaphore capping calls in flight across processes
+            self.requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+            self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+            self.max_concurrency = max_concurrency
+            self.min_concurrency = min_concurrency
+            self.base_backoff_s = base_backoff_s
+            self.max_backoff_s = max_backoff_s
+            self.limit = float(max_concurrency) # Grows by 1/limit per success, halves on a rate limit
+            self.in_flight = 0
+            self.paused_until = 0.0
+            self.last_decrease = 0.0
+            self.counters = {"calls": 0, "successes": 0, "rate_limited": 0, "errors": 0, "decreases": 0, "wait_s": 0.0}
+
+    def try_acquire(self, tokens: int) -> float:
+        # Takes a slot and returns 0, or returns how long to wait before trying again
+        with self.lock:
+            now = time.monotonic()
+            if now < self.paused_until:
+                return self.paused_until - now + random.uniform(0, 0.5) # Spread the restart after a cooldown
+            if self.in_flight >= int(self.limit):
+                return 0.05
+
+            for bucket, amount in ((self.requests, 1), (self.tokens, tokens)):
+                if bucket is not None:
+                    bucket.refill(now)
+                    wait = bucket.wait(amount)
+                    if wait > 0:
+                        return wait
+
+            if self.shared_slots is not None and not self.shared_slots.acquire(block=False):
+                return 0.05
+
+            if self.requests is not None:
+                self.requests.level -= 1
+            if self.tokens is not None:
+                self.tokens.level -= tokens
+            self.in_flight += 1
+            self.counters["calls"] += 1
+            return 0
+
+    def acquire(self, tokens: int):
+        start = time.monotonic()
+        while (delay := self.try_acquire(tokens)) > 0:
+            time.sleep(delay)
+        self.waited(time.monotonic() - start)
+
+    async def acquire_async(self, tokens: int):
+        start = time.monotonic()
+        while (delay := self.try_acquire(tokens)) > 0:
+            await asyncio.sleep(delay)
+        self.waited(time.monotonic() - start)
+
+    def waited(self, seconds: float):
+        with self.lock:
+            self.counters["wait_s"] += seconds
+        if seconds > 0:
+            tracer.add(rate_limit_wait_s=seconds) # Attributed to the enclosing model call or browser run
+
+    def release(self, lease: dict, error: BaseException | None = None):
+        with self.lock:
+            now = time.monotonic()
+            self.in_flight -= 1
+            if self.shared_slots is not None:
+                self.shared_slots.release()
+            if self.tokens is not None and lease.get("tokens_used") is not None:
+                self.tokens.level = min(self.tokens.capacity, self.tokens.level + lease["tokens"] - lease["tokens_used"]) # Settle the estimate against real usage
+
+            if error is None:
+                self.counters["successes"] += 1
+                self.limit = min(self.max_concurrency, self.limit + 1 / self.limit)
+            elif is_rate_limited(error):
+                self.counters["rate_limited"] += 1
+                delay = retry_after(error) or self.base_backoff_s * 5
+                self.paused_until = max(self.paused_until, now + delay)
+                if now - self.last_decrease >= delay: # One halving per cooldown, not one per in-flight failure
+                    self.limit = max(self.min_concurrency, self.limit / 2)
+                    self.last_decrease = now
+                    self.counters["decreases"] += 1
+                    logger.info(f"Rate limited, pausing {delay:.1f}s and lowering concurrency to {int(self.limit)}")
+            else:
+                self.counters["errors"] += 1
+
+    @contextmanager
+    def slot(self, tokens: int):
+        self.acquire(tokens)
+        lease = {"tokens": tokens}
+        try:
+            yield lease
+        except BaseException as e:
+            self.release(lease, e)
+            raise
+        self.release(lease)
+
+    @asynccontextmanager
+    async def slot_async(self, tokens: int):
+        await self.acquire_async(tokens)
+        lease = {"tokens": tokens}
+        try:
+            yield lease
+        except BaseException as e:
+            self.release(lease, e)
+            raise
+        self.release(lease)
+
+    def backoff(self, attempt: int, error: BaseException | None = None) -> float:
+        # Full jitter keeps agents that failed together from retrying together
+        delay = random.uniform(0, min(self.max_backoff_s, self.base_backoff_s * 2 ** attempt))
+        hint = retry_after(error) if error is not None else None
+        return max(delay, hint + random.uniform(0, self.base_backoff_s)) if hint else delay
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {**self.counters, "concurrency_limit": int(self.limit), "in_flight": self.in_flight}
+
+
+rate_limiter = RateLimiter() # Shared by every agent, the summarizer and the browser agents' LLMs
@@ -9,6 +9,10 @@ def reset_folders():
 
             print("Clearing " + item)
 
+    if os.path.isdir("./.blobs"):
+        shutil.rmtree("./.blobs") # Downloads and published files shared by reference
+        print("Clearing .blobs")
+
     with open("./file_system_collab/.gitkeep", "w") as f:
         pass
 
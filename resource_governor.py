@@ -0,0 +1,206 @@
+from dataclasses import asdict, dataclass
+from os.path import abspath, isdir, join
+from tracing import get_logger, tracer
+import asyncio
+import os
+import psutil
+import shutil
+
+logger = get_logger(__name__)
+
+MB = 1024 * 1024
+
+# Chromium caches that are rebuilt on demand, so pruning them never logs an agent out of a site
+CACHE_DIRS = ["Cache", "Code Cache", "GPUCache", "DawnGraphiteCache", "DawnWebGPUCache", "GrShaderCache", "GraphiteDawnCache", "ShaderCache", "Service Worker/CacheStorage", "Service Worker/ScriptCache"]
+
+
+def chromium_processes(user_data_dir: str) -> list[psutil.Process]:
+    profile = abspath(user_data_dir)
+    processes = []
+
+    for process in psutil.process_iter(["cmdline"]):
+        cmdline = process.info["cmdline"] or []
+        is_main = not any(arg.startswith("--type=") for arg in cmdline) # Renderer/GPU/utility processes carry --type
+        for arg in cmdline:
+            if is_main and arg.startswith("--user-data-dir=") and abspath(arg.split("=", 1)[1]) == profile:
+                processes.append(process)
+                try:
+                    processes += process.children(recursive=True)
+                except psutil.Error:
+                    pass
+                break
+
+    return processes
+
+
+def chromium_rss_mb(user_data_dir: str) -> float | None:
+    processes = chromium_processes(user_data_dir)
+    if not processes:
+        return None # Browser is not running
+
+    rss = 0
+    for process in processes:
+        try:
+            rss += process.memory_info().rss
+        except psutil.Error:
+            pass
+
+    return rss / MB
+
+
+def directory_size(path: str) -> int:
+    size = 0
+    for directory, _, files in os.walk(path):
+        for name in files:
+            try:
+                size += os.lstat(join(directory, name)).st_size
+            except OSError:
+                pass # Removed while walking
+
+    return size
+
+
+def prune_profile(user_data_dir: str) -> int:
+    # Deletes the caches of a profile whose browser is not running, returns the bytes freed
+    if not isdir(user_data_dir):
+        return 0
+
+    profiles = [user_data_dir] + [join(user_data_dir, name) for name in os.listdir(user_data_dir) if name == "Default" or name.startswith("Profile ")]
+    freed = 0
+    for profile in profiles:
+        for cache in CACHE_DIRS:
+            path = join(profile, cache)
+            if isdir(path):
+                freed += directory_size(path)
+                shutil.rmtree(path, ignore_errors=True)
+
+    return freed
+
+
+@dataclass
+class BrowserFootprint:
+    peak_rss_mb: float = 0.0
+    cpu_s: float = 0.0 # User and system time of the browser's processes while leased
+    samples: int = 0
+    profile_mb: float = 0.0 # After the last pruning
+    pruned_mb: float = 0.0
+    admission_wait_s: float = 0.0
+
+
+class ResourceGovernor:
+    # Admits browser runs only while the host has memory to spare, and measures what each agent's browser uses.
+    # Admission is by live headroom rather than a fixed count, so projects sharing a host also make room for each other.
+    footprints: dict[int, BrowserFootprint]
+    active: set[int]
+
+    def __init__(self, browser_rss_mb: float = 600, reserve_mb: float = 1024, max_profile_mb: float | None = 500, poll_s: float = 2.0):
+        self.browser_rss_mb = browser_rss_mb # Assumed footprint of a browser until one has been measured
+        self.reserve_mb = reserve_mb # Memory left for the rest of the host
+        self.max_profile_mb = max_profile_mb # A profile past this is pruned at the end of the work cycle
+        self.poll_s = poll_s
+        self.footprints = {}
+        self.active = set()
+        self.processes = {} # agent id -> browser processes found by the last sample
+        self.cpu_times = {} # agent id -> pid -> CPU seconds already counted
+        self.samplers = {}
+        self.lease_cpu_s = {} # agent id -> CPU seconds counted when its current run was admitted
+
+    def footprint(self, agent_id: int) -> BrowserFootprint:
+        return self.footprints.setdefault(agent_id, BrowserFootprint())
+
+    @staticmethod
+    def available_mb() -> float:
+        return psutil.virtual_memory().available / MB
+
+    def estimate_mb(self) -> float:
+        # A new browser is assumed to grow as large as the largest one measured so far
+        return max([footprint.peak_rss_mb for footprint in self.footprints.values() if footprint.samples] or [self.browser_rss_mb])
+
+    def capacity(self, limit: int) -> int:
+        # Browsers that fit in the memory available now, never more than `limit` and at least one
+        return max(1, min(limit, int((self.available_mb() - self.reserve_mb) // self.estimate_mb())))
+
+    def headroom(self) -> bool:
+        return self.available_mb() - self.reserve_mb >= self.estimate_mb()
+
+    async def admit(self, agent_id: int, user_data_dir: str, new_browser: bool = True):
+        # Waits until another browser fits; a warm browser is already counted in the available memory, and with
+        # nothing running here a new one goes ahead, since waiting could not free anything
+        waited = 0.0
+        while new_browser and self.active and not self.headroom():
+            if waited == 0:
+                logger.info(f"Agent {agent_id} waits for memory: {self.available_mb():.0f} MB available, {self.reserve_mb + self.estimate_mb():.0f} MB needed")
+            await asyncio.sleep(self.poll_s)
+            waited += self.poll_s
+
+        self.active.add(agent_id)
+        self.lease_cpu_s[agent_id] = self.footprint(agent_id).cpu_s
+        self.footprint(agent_id).admission_wait_s += waited
+        tracer.add(admission_wait_s=waited)
+        self.samplers[agent_id] = asyncio.create_task(self.sample_periodically(agent_id, user_data_dir))
+
+    async def release(self, agent_id: int, user_data_dir: str):
+        sampler = self.samplers.pop(agent_id, None)
+        if sampler is not None:
+            sampler.cancel()
+        await asyncio.to_thread(self.sample, agent_id, user_data_dir) # Counts CPU time up to the end of the run
+        self.active.discard(agent_id)
+        tracer.add(browser_cpu_s=self.footprint(agent_id).cpu_s - self.lease_cpu_s.pop(agent_id, self.footprint(agent_id).cpu_s))
+
+    async def sample_periodically(self, agent_id: int, user_data_dir: str):
+        while True:
+            await asyncio.to_thread(self.sample, agent_id, user_data_dir)
+            await asyncio.sleep(self.poll_s)
+
+    def sample(self, agent_id: int, user_data_dir: str):
+        # Only the process table scan is expensive, so the processes found are reused while the main one is alive
+        processes = self.processes.get(agent_id, [])
+        if not processes or not processes[0].is_running():
+            processes = chromium_processes(user_data_dir)
+        else:
+            try:
+                processes = [processes[0]] + processes[0].children(recursive=True)
+            except psutil.Error:
+                processes = chromium_processes(user_data_dir)
+        self.processes[agent_id] = processes
+
+        rss = 0
+        cpu_times = self.cpu_times.setdefault(agent_id, {})
+        footprint = self.footprint(agent_id)
+        for process in processes:
+            try:
+                rss += process.memory_info().rss
+                times = process.cpu_times()
+                cpu_s = times.user + times.system
+            except psutil.Error:
+                continue # Exited since the scan
+            footprint.cpu_s += cpu_s - cpu_times.get(process.pid, 0.0)
+            cpu_times[process.pid] = cpu_s
+
+        if processes:
+            footprint.samples += 1
+            footprint.peak_rss_mb = max(footprint.peak_rss_mb, rss / MB)
+
+    def profile_too_large(self, user_data_dir: str) -> bool:
+        return self.max_profile_mb is not None and directory_size(user_data_dir) / MB > self.max_profile_mb
+
+    def prune(self, agent_id: int, user_data_dir: str):
+        # Only for a profile whose browser has been closed
+        freed = prune_profile(user_data_dir)
+        footprint = self.footprint(agent_id)
+        footprint.pruned_mb += freed / MB
+        footprint.profile_mb = directory_size(user_data_dir) / MB
+        self.processes.pop(agent_id, None)
+        self.cpu_times.pop(agent_id, None) # Pids of a closed browser are not seen again
+        if freed:
+            logger.info(f"Pruned {freed / MB:.1f} MB of caches from {user_data_dir}")
+
+    def report(self) -> str:
+        rows = [f"{'agent':>5} {'peak rss MB':>11} {'cpu s':>8} {'profile MB':>10} {'pruned MB':>9} {'waited s':>8}"]
+        for agent_id, footprint in sorted(self.footprints.items()):
+            rows.append(f"{agent_id:>5} {footprint.peak_rss_mb:>11.1f} {footprint.cpu_s:>8.1f} {footprint.profile_mb:>10.1f} {footprint.pruned_mb:>9.1f} {footprint.admission_wait_s:>8.1f}")
+
+        return "\n".join(rows)
+
+    def stats(self) -> dict:
+        return {str(agent_id): asdict(footprint) for agent_id, footprint in self.footprints.items()}
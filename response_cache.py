@@ -0,0 +1,118 @@
+from collections import OrderedDict
+from hashlib import sha256
+from threading import Lock
+import json
+import os
+import time
+
+
+class ResponseCache:
+    # Validated structured responses addressed by a hash of the model, the schema and the full prompt, so asking
+    # the same question again costs nothing. Least recently used entries are evicted beyond `max_entries`.
+    hits: int
+    misses: int
+    entries: OrderedDict[str, tuple[float, dict]]
+
+    def __init__(self, max_entries: int = 1024, ttl_s: float | None = None):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s # Entries older than this are treated as missing
+        self.entries = OrderedDict() # key -> (time stored, parsed response)
+        self.hits = 0
+        self.misses = 0
+        self.lock = Lock()
+
+    @staticmethod
+    def key(model: str, schema: str, prompt: str) -> str:
+        return sha256(f"{model}\n{schema}\n{prompt}".encode("utf-8")).hexdigest()
+
+    def expired(self, stored_at: float) -> bool:
+        return self.ttl_s is not None and time.time() - stored_at > self.ttl_s
+
+    def load(self, key: str) -> tuple[float, dict] | None:
+        return self.entries.get(key)
+
+    def touch(self, key: str):
+        self.entries.move_to_end(key)
+
+    def store(self, key: str, value: dict):
+        self.entries[key] = (time.time(), value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def get(self, key: str) -> dict | None:
+        with self.lock:
+            entry = self.load(key)
+            if entry is None or self.expired(entry[0]):
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self.touch(key) # Marks it as recently used
+            return entry[1]
+
+    def put(self, key: str, value: dict):
+        with self.lock:
+            self.store(key, value)
+
+    def stats(self) -> dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self.entries)}
+
+
+class DiskResponseCache(ResponseCache):
+    # One JSON file per key, written to a temp file and renamed, so batch workers can share a directory.
+    # A file's modification time is its last use, the oldest files are evicted first.
+    def __init__(self, directory: str, max_entries: int = 10_000, ttl_s: float | None = None, evict_every: int = 64):
+        super().__init__(max_entries=max_entries, ttl_s=ttl_s)
+        self.directory = directory
+        self.evict_every = evict_every # Writes between scans of the directory, which may overshoot `max_entries` by this much
+        self.writes = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def load(self, key: str) -> tuple[float, dict] | None:
+        try:
+            with open(self.path(key), "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None # Missing, or evicted by another worker while being read
+
+        return entry["stored_at"], entry["value"]
+
+    def touch(self, key: str):
+        try:
+            os.utime(self.path(key))
+        except FileNotFoundError:
+            pass
+
+    def store(self, key: str, value: dict):
+        temp_path = os.path.join(self.directory, f".tmp-{os.getpid()}-{key}.json")
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump({"stored_at": time.time(), "value": value}, f)
+        os.replace(temp_path, self.path(key))
+
+        self.writes += 1
+        if self.writes % self.evict_every == 0:
+            self.evict()
+
+    def evict(self):
+        files = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".json") and not entry.name.startswith(".tmp-"):
+                try:
+                    files.append((entry.stat().st_mtime, entry.path))
+                except FileNotFoundError:
+                    pass # Another worker evicted it first
+        if len(files) <= self.max_entries:
+            return
+
+        for _, path in sorted(files)[:len(files) - self.max_entries]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def stats(self) -> dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "entries": sum(1 for name in os.listdir(self.directory) if name.endswith(".json") and not name.startswith(".tmp-"))}
@@ -0,0 +1,171 @@
+from collections import Counter
+from dataclasses import dataclass
+from document_reader import DocumentReader
+from manifest import WorkspaceManifest
+from os.path import basename, dirname
+from tracing import get_logger
+from transcript import estimate_tokens
+import math
+import re
+
+WORD = re.compile(r"[a-z0-9]+")
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "has", "have", "in", "is", "it", "its", "of", "on",
+    "or", "that", "the", "this", "to", "was", "were", "will", "with", "you", "your", "we", "our", "should", "can"
+}
+INDEXED_EXTENSIONS = ["txt", "md", "csv", "json", "pdf"]
+
+logger = get_logger(__name__)
+
+
+def tokenize(text: str) -> list[str]:
+    return [word for word in WORD.findall(text.lower()) if word not in STOPWORDS]
+
+
+def chunk_text(text: str, max_chars: int = 1200) -> list[str]:
+    # Packs paragraphs into chunks so snippets stay readable; oversized paragraphs are split by length
+    chunks = []
+    current = ""
+
+    for paragraph in re.split(r"\n\s*\n", text):
+        paragraph = paragraph.strip()
+        while len(paragraph) > max_chars:
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.append(paragraph[:max_chars])
+            paragraph = paragraph[max_chars:]
+
+        if not paragraph:
+            continue
+
+        if len(current) + len(paragraph) + 2 > max_chars and current:
+            chunks.append(current)
+            current = ""
+        current = f"{current}\n\n{paragraph}" if current else paragraph
+
+    if current:
+        chunks.append(current)
+
+    return chunks
+
+
+@dataclass
+class Chunk:
+    path: str
+    index: int
+    text: str
+    length: int
+
+
+class RetrievalIndex:
+    # BM25 over chunks of the shared files, updated one file at a time as the manifest changes
+    k1: float = 1.5
+    b: float = 0.75
+    chunks: dict[tuple[str, int], Chunk]
+    postings: dict[str, dict[tuple[str, int], int]]
+    indexed: dict[str, str]
+    file_chunks: dict[str, int]
+    total_length: int
+
+    def __init__(self, document_reader: DocumentReader, max_chunk_chars: int = 1200):
+        self.document_reader = document_reader
+        self.max_chunk_chars = max_chunk_chars
+        self.chunks = {}
+        self.postings = {} # term -> {chunk id: term frequency}
+        self.indexed = {} # path -> sha256 of the indexed contents
+        self.file_chunks = {} # path -> number of chunks
+        self.total_length = 0
+
+    def remove(self, path: str):
+        for i in range(self.file_chunks.pop(path, 0)):
+            chunk_id = (path, i)
+            chunk = self.chunks.pop(chunk_id)
+            self.total_length -= chunk.length
+            for term in set(tokenize(chunk.text)):
+                postings = self.postings.get(term)
+                if postings is not None:
+                    postings.pop(chunk_id, None)
+                    if not postings:
+                        del self.postings[term]
+
+        self.indexed.pop(path, None)
+
+    def add(self, path: str, text: str, digest: str):
+        self.remove(path)
+
+        chunks = chunk_text(text, self.max_chunk_chars)
+        for i, text_chunk in enumerate(chunks):
+            terms = tokenize(text_chunk)
+            chunk_id = (path, i)
+            self.chunks[chunk_id] = Chunk(path=path, index=i, text=text_chunk, length=len(terms))
+            self.total_length += len(terms)
+            for term, count in Counter(terms).items():
+                self.postings.setdefault(term, {})[chunk_id] = count
+
+        self.indexed[path] = digest
+        self.file_chunks[path] = len(chunks)
+
+    def read(self, path: str) -> str:
+        if path.endswith(".pdf"):
+            return self.document_reader.read_pdf(path)[0]
+
+        return self.document_reader.read_text(path, max_lines=100_000)[0]
+
+    def sync(self, manifest: WorkspaceManifest) -> int:
+        # Re-indexes only files whose hash changed since they were last indexed
+        shared = {path: entry for path, entry in manifest.entries.items() if manifest.owners.get(dirname(path)) is None}
+        updated = 0
+
+        for path in [path for path in self.indexed if path not in shared]:
+            self.remove(path)
+            updated += 1
+
+        for path, entry in shared.items():
+            if self.indexed.get(path) == entry.sha256 or path.split(".")[-1] not in INDEXED_EXTENSIONS:
+                continue
+
+            try:
+                self.add(path, self.read(path), entry.sha256)
+            except Exception as e:
+                logger.warning(f"Could not index {path}: {e}")
+                continue
+            updated += 1
+
+        return updated
+
+    def search(self, query: str, k: int = 5) -> list[tuple[float, Chunk]]:
+        if not self.chunks:
+            return []
+
+        average_length = self.total_length / len(self.chunks) or 1
+        scores = {}
+
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+
+            idf = math.log(1 + (len(self.chunks) - len(postings) + 0.5) / (len(postings) + 0.5))
+            for chunk_id, frequency in postings.items():
+                length = self.chunks[chunk_id].length
+                scores[chunk_id] = scores.get(chunk_id, 0) + idf * frequency * (self.k1 + 1) / (frequency + self.k1 * (1 - self.b + self.b * length / average_length))
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+        return [(score, self.chunks[chunk_id]) for chunk_id, score in ranked]
+
+    def render(self, query: str, token_budget: int = 1500, k: int = 5) -> str:
+        snippets = []
+        budget = token_budget
+
+        for score, chunk in self.search(query, k):
+            if budget <= 0:
+                break
+
+            snippet = f"[{basename(dirname(chunk.path))}/{basename(chunk.path)}, part {chunk.index + 1}]\n{chunk.text}\n"
+            if estimate_tokens(snippet) > budget:
+                snippet = snippet[:budget * 4] + "...\n" # Still show the start of the best match
+            budget -= estimate_tokens(snippet)
+            snippets.append(snippet)
+
+        return "\n".join(snippets) if snippets else "No relevant collaborative or output file contents found."
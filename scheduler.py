@@ -0,0 +1,171 @@
+from dataclasses import dataclass, field
+from itertools import count
+from tracing import get_logger
+from typing import Awaitable, Callable
+import asyncio
+import time
+
+logger = get_logger(__name__)
+
+
+@dataclass
+class ScheduledTask:
+    task_id: int
+    agent_id: int
+    description: str
+    depends_on: set[int] = field(default_factory=set) # Task ids that must finish before this one starts
+    submitted: float = field(default_factory=time.perf_counter)
+    started: float | None = None
+    finished: float | None = None
+
+
+class TaskScheduler:
+    # Dispatches each agent's next task as soon as the tasks it depends on have finished, instead of
+    # holding every agent at a per-iteration barrier. While tasks assigned by the team are still running,
+    # an agent that finishes re-plans on its own; run() returns once every agent is idle, which is when
+    # the team discusses.
+    tasks: dict[int, ScheduledTask]
+    pending: dict[int, ScheduledTask]
+    active: dict[int, ScheduledTask]
+    batch: set[int]
+    phase_tasks: dict[int, int]
+    busy_s: dict[int, float]
+
+    def __init__(self,
+                 run_task: Callable[[ScheduledTask], Awaitable[None]],
+                 replan: Callable[[ScheduledTask], Awaitable[tuple[str, list[int]] | None]],
+                 max_tasks_per_phase: int = 4):
+        self.run_task = run_task
+        self.replan = replan # Returns (next task, agent ids it depends on), or None to wait for the team
+        self.max_tasks_per_phase = max_tasks_per_phase # Per agent, so very short tasks cannot re-plan forever
+        self.tasks = {}
+        self.pending = {} # agent id -> next task, at most one per agent
+        self.active = {} # agent id -> running task
+        self.batch = set() # Ids of the tasks assigned by the last brainstorm or discussion
+        self.phase_tasks = {} # agent id -> tasks started since run() was called
+        self.busy_s = {}
+        self.wall_s = 0.0
+        self.replans = 0
+        self.ids = count(1)
+
+    def add_agent(self, agent_id: int):
+        self.busy_s[agent_id] = 0.0
+
+    def latest(self, agent_id: int) -> ScheduledTask | None:
+        # The unfinished task a new dependency on this agent should wait for
+        return self.pending.get(agent_id) or self.active.get(agent_id)
+
+    def submit(self, agent_id: int, description: str, depends_on: list[int] | None = None) -> ScheduledTask | None:
+        if agent_id not in self.busy_s:
+            return None
+
+        previous = self.pending.pop(agent_id, None)
+        if previous is not None:
+            previous.finished = time.perf_counter() # Superseded, so anything waiting on it is released
+
+        task = ScheduledTask(task_id=next(self.ids), agent_id=agent_id, description=description)
+        for dependency in depends_on or []:
+            latest = self.latest(dependency) if dependency != agent_id else None
+            if latest is not None:
+                task.depends_on.add(latest.task_id)
+
+        self.tasks[task.task_id] = task
+        self.pending[agent_id] = task
+        return task
+
+    def submit_batch(self, assignments: dict[int, str], dependencies: dict[int, list[int]]):
+        # Tasks assigned together may depend on each other, so all of them exist before dependencies are resolved
+        tasks = {agent_id: self.submit(agent_id, description) for agent_id, description in assignments.items()}
+        self.batch = {task.task_id for task in tasks.values() if task is not None}
+
+        for agent_id, task in tasks.items():
+            if task is None:
+                continue
+            for dependency in dependencies.get(agent_id, []):
+                latest = self.latest(dependency) if dependency != agent_id else None
+                if latest is not None:
+                    task.depends_on.add(latest.task_id)
+
+    def state(self) -> dict:
+        # Only queued tasks matter between phases, running ones finish before a phase ends
+        return {
+            str(agent_id): {
+                "description": task.description,
+                "depends_on": sorted({self.tasks[dependency].agent_id for dependency in task.depends_on if self.tasks[dependency].finished is None})
+            }
+            for agent_id, task in self.pending.items()
+        }
+
+    def restore(self, state: dict):
+        self.submit_batch(
+            {int(agent_id): task["description"] for agent_id, task in state.items()},
+            {int(agent_id): task["depends_on"] for agent_id, task in state.items()}
+        )
+
+    def ready(self) -> list[ScheduledTask]:
+        return [
+            task for agent_id, task in self.pending.items()
+            if agent_id not in self.active and all(self.tasks[dependency].finished is not None for dependency in task.depends_on)
+        ]
+
+    def batch_running(self) -> bool:
+        return any(self.tasks[task_id].finished is None for task_id in self.batch)
+
+    def start(self, task: ScheduledTask) -> asyncio.Task:
+        del self.pending[task.agent_id]
+        self.active[task.agent_id] = task
+        self.phase_tasks[task.agent_id] = self.phase_tasks.get(task.agent_id, 0) + 1
+        task.started = time.perf_counter()
+        logger.debug(f"Starting task {task.task_id} for Agent_{task.agent_id} after {task.started - task.submitted:.1f}s in the queue")
+        return asyncio.create_task(self.run_task(task))
+
+    async def run(self):
+        start = time.perf_counter()
+        self.phase_tasks = {}
+        running = {} # asyncio task -> ("work" | "replan", scheduled task)
+
+        while True:
+            for task in self.ready():
+                running[self.start(task)] = ("work", task)
+
+            if not running:
+                if not self.pending:
+                    break
+
+                # Nothing runs but tasks are waiting, which only a dependency cycle can cause
+                task = min(self.pending.values(), key=lambda task: task.task_id)
+                logger.warning(f"Dependency cycle detected, starting task {task.task_id} of Agent_{task.agent_id} anyway")
+                task.depends_on.clear()
+                continue
+
+            finished, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for future in finished:
+                kind, task = running.pop(future)
+
+                if kind == "work":
+                    task.finished = time.perf_counter()
+                    del self.active[task.agent_id]
+                    self.busy_s[task.agent_id] += task.finished - task.started
+                    if future.exception() is not None:
+                        logger.error(f"Task {task.task_id} of Agent_{task.agent_id} failed: {future.exception()}")
+
+                    if self.batch_running() and self.phase_tasks[task.agent_id] < self.max_tasks_per_phase and task.agent_id not in self.pending:
+                        self.replans += 1 # Teammates are still on their assigned tasks, so this agent plans its own next step
+                        running[asyncio.create_task(self.replan(task))] = ("replan", task)
+                elif future.exception() is not None:
+                    logger.warning(f"Re-planning for Agent_{task.agent_id} failed: {future.exception()}")
+                elif future.result() is not None and self.batch_running(): # Once the team's tasks are done the discussion takes over
+                    description, depends_on = future.result()
+                    self.submit(task.agent_id, description, depends_on)
+
+        self.wall_s += time.perf_counter() - start
+
+    def stats(self) -> dict:
+        busy = sum(self.busy_s.values())
+        return {
+            "wall_s": round(self.wall_s, 3),
+            "busy_s": round(busy, 3),
+            "utilization": round(busy / (self.wall_s * len(self.busy_s)), 3) if self.wall_s and self.busy_s else 0.0,
+            "replans": self.replans,
+            "tasks": len(self.tasks)
+        }
@@ -0,0 +1,96 @@
+import math
+
+
+class StallDetector:
+    # Flags a browser run that keeps repeating one action or stops reaching new pages and writing files
+    window: int
+    seen_urls: set[str]
+
+    def __init__(self, window: int = 10):
+        self.window = window
+        self.seen_urls = set()
+        self.last_action = None
+        self.repeats = 0
+        self.files_written = 0
+        self.steps = 0
+        self.progress_steps = 0
+        self.last_progress_step = 0
+
+    def observe(self, action: str, url: str, files_written: int) -> str | None:
+        self.steps += 1
+        self.repeats = self.repeats + 1 if action == self.last_action else 1
+        self.last_action = action
+
+        if (url and url not in self.seen_urls) or files_written > self.files_written:
+            self.progress_steps += 1
+            self.last_progress_step = self.steps
+        self.seen_urls.add(url)
+        self.files_written = files_written
+
+        if self.repeats >= self.window:
+            return f"repeated the same action {self.repeats} times"
+        if self.steps - self.last_progress_step >= self.window:
+            return f"no new page or file write in {self.steps - self.last_progress_step} steps"
+        return None
+
+
+class StepBudget:
+    # Sizes an agent's next work cycle from how many steps and seconds its previous cycles actually needed
+    steps_needed: float | None
+    seconds_per_step: float | None
+
+    def __init__(self,
+                 default_steps: int,
+                 min_steps: int = 10,
+                 max_steps: int | None = None,
+                 default_deadline_s: float = 900,
+                 min_deadline_s: float = 120,
+                 headroom: float = 1.5,
+                 smoothing: float = 0.5):
+        self.default_steps = default_steps
+        self.min_steps = min(min_steps, default_steps)
+        self.max_steps = max_steps or default_steps * 2
+        self.default_deadline_s = default_deadline_s
+        self.min_deadline_s = min_deadline_s
+        self.headroom = headroom
+        self.smoothing = smoothing # Weight of the newest cycle in the moving averages
+        self.steps_needed = None
+        self.seconds_per_step = None
+
+    def state(self) -> dict:
+        return {"steps_needed": self.steps_needed, "seconds_per_step": self.seconds_per_step}
+
+    def restore(self, state: dict):
+        self.steps_needed = state["steps_needed"]
+        self.seconds_per_step = state["seconds_per_step"]
+
+    def average(self, previous: float | None, sample: float) -> float:
+        return sample if previous is None else self.smoothing * sample + (1 - self.smoothing) * previous
+
+    def record(self, work_run):
+        if work_run.steps_used == 0:
+            return
+
+        efficiency = work_run.progress_steps / work_run.steps_used
+        if work_run.stop_reason == "done":
+            sample = work_run.steps_used
+        elif work_run.stop_reason == "max_steps":
+            sample = work_run.steps_used * (1 + efficiency) # Only cycles that kept making progress earn a larger budget
+        else:
+            sample = max(work_run.last_progress_step, self.min_steps) # Steps after the last progress were wasted
+
+        self.steps_needed = self.average(self.steps_needed, sample)
+        if work_run.duration_s:
+            self.seconds_per_step = self.average(self.seconds_per_step, work_run.duration_s / work_run.steps_used)
+
+    def steps(self) -> int:
+        if self.steps_needed is None:
+            return self.default_steps
+
+        return max(self.min_steps, min(self.max_steps, math.ceil(self.steps_needed * self.headroom)))
+
+    def deadline_s(self) -> float:
+        if self.seconds_per_step is None:
+            return self.default_deadline_s
+
+        return max(self.min_deadline_s, min(self.default_deadline_s * 2, self.steps() * self.seconds_per_step)) # steps() already includes the headroom
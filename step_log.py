@@ -0,0 +1,159 @@
+from dataclasses import asdict, dataclass, field
+from transcript import estimate_tokens
+import re
+
+MEMORY_DIGEST_CHARS = 240
+ERROR_CHARS = 160
+
+
+def digest(text: str | None, max_chars: int) -> str:
+    text = " ".join((text or "").split())
+    if len(text) <= max_chars:
+        return text
+
+    return text[:max_chars].rsplit(" ", 1)[0] + "..."
+
+
+def normalize(text: str) -> str:
+    # Scroll positions, page numbers and counters differ between otherwise identical steps
+    return re.sub(r"[\W\d_]+", " ", text.lower()).strip()
+
+
+@dataclass(slots=True)
+class StepRecord:
+    # What one browser agent step did, without the bulky action and thinking fields of the raw model output
+    step: int
+    goal: str = ""
+    evaluation: str = ""
+    memory: str = "" # Digest only, the agent's running memory repeats most of itself every step
+    urls: list[str] = field(default_factory=list)
+    files: list[str] = field(default_factory=list) # Files written during the step, relative to the workspace root
+    errors: list[str] = field(default_factory=list)
+
+    @classmethod
+    def from_dict(cls, step: int, data: dict) -> "StepRecord":
+        if "step" in data:
+            return cls(**data)
+
+        # Cassettes recorded before step records stored model_dump() of the browser agent's output
+        return cls(
+            step=step,
+            goal=data.get("next_goal") or "",
+            evaluation=data.get("evaluation_previous_goal") or "",
+            memory=digest(data.get("memory"), MEMORY_DIGEST_CHARS)
+        )
+
+    def repeats(self, other: "StepRecord") -> bool:
+        # Near-identical steps that achieved nothing new collapse into one line when rendered
+        return not (self.files or self.errors or other.files or other.errors) and self.urls == other.urls \
+            and normalize(self.goal) == normalize(other.goal) and normalize(self.evaluation) == normalize(other.evaluation)
+
+    def render(self, previous_urls: list[str], with_memory: bool) -> str:
+        line = f"goal={self.goal!r} evaluation={self.evaluation!r}"
+        if with_memory and self.memory:
+            line += f" memory={self.memory!r}"
+        if self.urls and self.urls != previous_urls:
+            line += f" urls={self.urls}" # Only shown when the agent moved to another page
+        if self.files:
+            line += f" files={self.files}"
+        if self.errors:
+            line += f" errors={self.errors}"
+        return line
+
+
+@dataclass(slots=True)
+class WorkCycle:
+    task: str
+    steps: list[StepRecord]
+    stop_reason: str = "done"
+    error: str | None = None # Set when the work cycle raised instead of returning
+
+    def render(self, token_budget: int) -> str:
+        lines = []
+        previous_urls = []
+        i = 0
+        while i < len(self.steps):
+            step = self.steps[i]
+            last = i
+            while last + 1 < len(self.steps) and self.steps[last + 1].repeats(step):
+                last += 1
+
+            label = f"Step {step.step}" if last == i else f"Steps {step.step}-{self.steps[last].step} (same step repeated)"
+            # The agent's memory is cumulative, so only the latest one is worth its tokens
+            lines.append((i, last, f"{label}: {step.render(previous_urls, with_memory=last == len(self.steps) - 1)}"))
+            previous_urls = step.urls
+            i = last + 1
+
+        # Over budget, the first step and the most recent ones are kept and the middle is summarized
+        kept = lines
+        if sum(estimate_tokens(line) for _, _, line in lines) > token_budget and len(lines) > 2:
+            used = estimate_tokens(lines[0][2])
+            tail = []
+            for line in reversed(lines[1:]):
+                used += estimate_tokens(line[2])
+                if used > token_budget and tail:
+                    break
+                tail.insert(0, line)
+            omitted = self.steps[lines[0][1] + 1:tail[0][0]]
+            if omitted:
+                kept = [lines[0], (0, 0, self.summarize(omitted)), *tail]
+
+        text = [line for _, _, line in kept]
+        if self.error is not None:
+            text.append(f"Work cycle failed: {self.error}")
+        elif self.stop_reason not in ("done", "max_steps"):
+            text.append(f"Work cycle stopped early ({self.stop_reason}), the steps above are what was completed.")
+        return "\n".join(text)
+
+    def outline(self) -> str:
+        # One line on how the cycle ended, for readers that do not need its steps
+        files = sorted({path for step in self.steps for path in step.files})
+        last_goal = next((step.goal for step in reversed(self.steps) if step.goal), "")
+        outline = f"failed: {digest(self.error, ERROR_CHARS)}" if self.error is not None else f"{self.stop_reason} after {len(self.steps)} steps"
+        if files:
+            outline += f", files written {files}"
+        if last_goal:
+            outline += f", last goal {digest(last_goal, ERROR_CHARS)!r}"
+        return outline
+
+    @staticmethod
+    def summarize(steps: list[StepRecord]) -> str:
+        summary = f"Steps {steps[0].step}-{steps[-1].step} omitted: {len({url for step in steps for url in step.urls})} pages visited"
+        files = sorted({path for step in steps for path in step.files})
+        errors = [error for step in steps for error in step.errors]
+        if files:
+            summary += f", files written {files}"
+        if errors:
+            summary += f", {len(errors)} error(s), the last one: {errors[-1]!r}"
+        return summary
+
+
+class StepLog:
+    # Append-only record of an agent's work cycles, one per task
+    cycles: list[WorkCycle]
+
+    def __init__(self):
+        self.cycles = []
+
+    def __len__(self) -> int:
+        return len(self.cycles)
+
+    def append(self, cycle: WorkCycle):
+        self.cycles.append(cycle)
+
+    def latest(self) -> WorkCycle | None:
+        return self.cycles[-1] if self.cycles else None
+
+    def state(self) -> list[dict]:
+        return [asdict(cycle) for cycle in self.cycles]
+
+    def restore(self, state: list[dict]):
+        self.cycles = [
+            WorkCycle(
+                task=cycle["task"],
+                steps=[StepRecord(**step) for step in cycle["steps"]],
+                stop_reason=cycle["stop_reason"],
+                error=cycle["error"]
+            )
+            for cycle in state
+        ]
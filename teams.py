@@ -0,0 +1,32 @@
+from dataclasses import dataclass
+import math
+
+
+@dataclass
+class SubTeam:
+    team_id: int
+    members: list[int] # Agent ids, the first one leads the team
+    objective: str = "" # Set by the leads, split among the members by the team itself
+
+    @property
+    def lead(self) -> int:
+        return self.members[0]
+
+    @property
+    def name(self) -> str:
+        return f"Team_{self.team_id}"
+
+    def member_names(self) -> set[str]:
+        return {f"Agent_{agent_id}" for agent_id in self.members}
+
+
+def form_teams(agent_ids: list[int], team_size: int) -> list[SubTeam]:
+    # Contiguous, evenly sized teams, so traits assigned round-robin are spread across every team
+    total_teams = math.ceil(len(agent_ids) / team_size)
+    teams = []
+    start = 0
+    for team_id in range(total_teams):
+        size = len(agent_ids) // total_teams + (1 if team_id < len(agent_ids) % total_teams else 0)
+        teams.append(SubTeam(team_id=team_id, members=agent_ids[start:start + size]))
+        start += size
+    return teams
@@ -0,0 +1,62 @@
+from file_store import PatchError, apply_unified_diff, parse_unified_diff
+import pytest
+
+
+def test_single_hunk():
+    diff = "@@ -1,2 +1,2 @@\n a\n-b\n+c\n"
+    assert apply_unified_diff("a\nb\n", diff) == "a\nc\n"
+
+
+def test_file_headers_before_first_hunk_are_skipped():
+    diff = "diff --git a/notes.md b/notes.md\n--- a/notes.md\n+++ b/notes.md\n@@ -1,2 +1,2 @@\n a\n-b\n+c\n"
+    assert parse_unified_diff(diff) == [(1, 2, ["a", "b"], ["a", "c"])]
+
+
+def test_added_line_starting_with_plus_plus():
+    diff = "@@ -1,2 +1,3 @@\n a\n+++counter\n b\n"
+    assert apply_unified_diff("a\nb\n", diff) == "a\n++counter\nb\n"
+
+
+def test_removed_line_starting_with_dashes():
+    diff = "@@ -1,3 +1,2 @@\n a\n--- note\n b\n"
+    assert apply_unified_diff("a\n-- note\nb\n", diff) == "a\nb\n"
+
+
+def test_removed_markdown_rule():
+    diff = "@@ -1,3 +1,2 @@\n # Title\n----\n Text\n"
+    assert apply_unified_diff("# Title\n---\nText\n", diff) == "# Title\nText\n"
+
+
+def test_context_line_with_dashes():
+    diff = "@@ -1,3 +1,3 @@\n # Title\n ---\n-Text\n+More text\n"
+    assert apply_unified_diff("# Title\n---\nText\n", diff) == "# Title\n---\nMore text\n"
+
+
+def test_several_hunks():
+    diff = "@@ -1,1 +1,1 @@\n-a\n+A\n@@ -3,1 +3,1 @@\n-c\n+C\n"
+    assert apply_unified_diff("a\nb\nc\n", diff) == "A\nb\nC\n"
+
+
+def test_hunk_found_away_from_its_line_number():
+    diff = "@@ -10,2 +10,2 @@\n b\n-c\n+C\n"
+    assert apply_unified_diff("a\nb\nc\nd\n", diff) == "a\nb\nC\nd\n"
+
+
+def test_blank_context_line_without_leading_space():
+    diff = "@@ -1,3 +1,3 @@\n a\n\n-c\n+C\n"
+    assert apply_unified_diff("a\n\nc\n", diff) == "a\n\nC\n"
+
+
+def test_no_newline_marker_is_ignored():
+    diff = "@@ -1 +1 @@\n-a\n\\ No newline at end of file\n+b\n"
+    assert parse_unified_diff(diff) == [(1, 1, ["a"], ["b"])]
+
+
+def test_missing_hunks():
+    with pytest.raises(PatchError):
+        parse_unified_diff("--- a/notes.md\n+++ b/notes.md\n")
+
+
+def test_mismatched_context():
+    with pytest.raises(PatchError):
+        apply_unified_diff("a\nb\n", "@@ -1,2 +1,2 @@\n a\n-x\n+y\n")
@@ -0,0 +1,228 @@
+from document_reader import MAX_PDF_PAGES, MAX_TEXT_LINES
+from file_store import PatchError, VersionConflict
+from os.path import isfile, samefile
+from tracing import tracer
+from typing import TYPE_CHECKING
+from workspace import Workspace
+import asyncio
+
+if TYPE_CHECKING:
+    from browser_use import Tools
+
+READABLE_EXTENSIONS = ["txt", "md", "csv", "json", "pdf"]
+WRITABLE_EXTENSIONS = ["txt", "md", "csv", "json"]
+
+
+def build_tools(agent_id: int, workspace: Workspace) -> "Tools":
+    from browser_use import Tools
+
+    tools = Tools(exclude_actions=['write_file', 'read_file', 'replace_file_str'])
+    file_store = workspace.file_store
+    document_reader = workspace.document_reader
+    blob_store = workspace.blob_store
+
+    def resolve(filename: str, file_type: str, extensions: list[str], must_exist: bool = True) -> tuple[str | None, str | None]:
+        path = workspace.path(file_type, agent_id)
+
+        if not filename:
+            return None, "Error: File name was not provided."
+
+        if len(filename.split(".")) == 1 or filename.split(".")[-1] not in extensions:
+            return None, f"Error: Invalid file extension."
+
+        if "/" in filename or "\\" in filename:
+            return None, "Error: File name cannot contain a path."
+
+        if must_exist and not isfile(f"{path}/{filename}"):
+            return None, f"Error: File {filename} was not found."
+
+        return f"{path}/{filename}", None
+
+    async def read_file(filename: str, file_type: str, start: int = 0, limit: int | None = None) -> str:
+        path, error = resolve(filename, file_type, READABLE_EXTENSIONS)
+        if error:
+            return error
+
+        if start < 0 or (limit is not None and limit <= 0):
+            return "Error: `start` must be non-negative and `limit` must be positive."
+
+        extension = filename.split(".")[-1]
+
+        if extension in WRITABLE_EXTENSIONS:
+            limit = limit or MAX_TEXT_LINES
+            with tracer.span("tool.read_file", agent_id=agent_id, file_type=file_type) as span:
+                (contents, total_lines), version = await document_reader.read_text_versioned(file_store, path, start_line=start, max_lines=limit)
+                span["bytes_read"] = len(contents.encode("utf-8"))
+
+            more_lines = total_lines is None or start + limit < total_lines
+            more_lines_text = f'\nMore lines remain, read again with start={start + limit} to continue...' if more_lines else ''
+
+            return f'Successfully read from {file_type} file {filename} (version {version}).\n<content>\n{contents}{more_lines_text}\n</content>'
+        else:  # extension is pdf
+            limit = min(limit or MAX_PDF_PAGES, MAX_PDF_PAGES)
+            with tracer.span("tool.read_file", agent_id=agent_id, file_type=file_type) as span:
+                extracted_text, num_pages = await document_reader.read_pdf_async(path, start_page=start, max_pages=limit)
+                span["bytes_read"] = len(extracted_text.encode("utf-8"))
+            extra_pages = num_pages - (start + limit)
+
+            extra_pages_text = f'{extra_pages} more pages, read again with start={start + limit} to continue...' if extra_pages > 0 else ''
+
+            return f'Successfully read from {file_type} file {filename}.\n<content>\n{extracted_text}\n{extra_pages_text}</content>'
+
+    def write_file(filename: str, contents: str, file_type: str) -> str:
+        path, error = resolve(filename, file_type, WRITABLE_EXTENSIONS, must_exist=False)
+        if error:
+            return error
+
+        with tracer.span("tool.write_file", agent_id=agent_id, file_type=file_type, bytes_written=len(contents.encode("utf-8"))):
+            version = file_store.write(path, contents, author=agent_id)
+
+        return f'Successfully wrote to {file_type} file {filename} (version {version})'
+
+    def append_file(filename: str, contents: str, file_type: str) -> str:
+        path, error = resolve(filename, file_type, WRITABLE_EXTENSIONS, must_exist=False)
+        if error:
+            return error
+
+        with tracer.span("tool.append_file", agent_id=agent_id, file_type=file_type, bytes_written=len(contents.encode("utf-8"))):
+            version = file_store.append(path, contents, author=agent_id)
+
+        return f'Successfully appended to {file_type} file {filename} (version {version})'
+
+    def replace_file_str(filename: str, old_str: str, new_str: str, file_type: str, expected_version: int | None = None) -> str:
+        path, error = resolve(filename, file_type, WRITABLE_EXTENSIONS)
+        if error:
+            return error
+
+        if not old_str:
+            return "Error: Cannot replace empty string. Please provide a non-empty string to replace."
+
+        try:
+            with tracer.span("tool.replace_file_str", agent_id=agent_id, file_type=file_type, bytes_written=len(new_str.encode("utf-8"))):
+                count, version = file_store.replace(path, old_str, new_str, expected_version=expected_version, author=agent_id)
+        except VersionConflict as e:
+            return f"Error: {e}. Another agent changed the file, read it again before replacing."
+
+        if count == 0:
+            return f'Error: "{old_str}" was not found in {file_type} file {filename}.'
+
+        return f'Successfully replaced all occurrences of "{old_str}" with "{new_str}" in {file_type} file {filename} (version {version})'
+
+    def patch_file(filename: str, diff: str, file_type: str, expected_version: int | None = None) -> str:
+        path, error = resolve(filename, file_type, WRITABLE_EXTENSIONS)
+        if error:
+            return error
+
+        try:
+            with tracer.span("tool.patch_file", agent_id=agent_id, file_type=file_type, bytes_written=len(diff.encode("utf-8"))):
+                version = file_store.patch(path, diff, expected_version=expected_version, author=agent_id)
+        except VersionConflict as e:
+            return f"Error: {e}. Another agent changed the file, read it again before patching."
+        except PatchError as e:
+            return f"Error: Could not apply patch to {file_type} file {filename}: {e}"
+
+        return f'Successfully patched {file_type} file {filename} (version {version})'
+
+    async def publish_file(filename: str, to: str) -> str:
+        if to not in ("collab", "output"):
+            return 'Error: `to` must be "collab" or "output".'
+
+        source, error = resolve(filename, "private", READABLE_EXTENSIONS)
+        if error:
+            return error
+        destination = f"{workspace.path(to, agent_id)}/{filename}"
+
+        with tracer.span("tool.publish_file", agent_id=agent_id, file_type=to) as span:
+            # Hashing, and copying where hard links are unsupported, scale with the file, so they run off the event loop
+            blob = await asyncio.to_thread(workspace.ingest, source, author=agent_id)
+            version = await asyncio.to_thread(file_store.link, destination, lambda path: blob_store.link(blob.sha256, path), author=agent_id)
+            span["bytes_linked"] = blob.size
+
+        return f'Successfully published private file {filename} to {to} file {filename} (version {version})'
+
+    async def find_download(url: str) -> str:
+        blob = blob_store.find_url(url)
+        if blob is None:
+            return f"No agent has downloaded {url} yet, download it yourself."
+
+        directory = workspace.path("private", agent_id)
+        filename = blob.name
+        if isfile(f"{directory}/{filename}") and not samefile(f"{directory}/{filename}", blob_store.blob_path(blob.sha256)):
+            filename = f"{blob.sha256[:8]}-{blob.name}" # Keeps an unrelated private file of the same name
+
+        with tracer.span("tool.find_shared_download", agent_id=agent_id) as span:
+            if not isfile(f"{directory}/{filename}"):
+                await asyncio.to_thread(file_store.link, f"{directory}/{filename}", lambda path: blob_store.link(blob.sha256, path), author=agent_id)
+            span["bytes_linked"] = blob.size
+
+        return f"{url} was already downloaded, skip the download and use private file {filename} ({blob.size} bytes)."
+
+    @tools.action(description='Read a private file named `filename`. Optionally pass `start` (first line, or first page for PDFs) and `limit` (number of lines or pages) to page through large files')
+    async def read_private_file(filename: str, start: int = 0, limit: int | None = None) -> str:
+        return await read_file(filename=filename, file_type="private", start=start, limit=limit)
+
+    @tools.action(description='Write `contents` to a private file named `filename`. Overwrites previous file if it already exists.')
+    def write_private_file(filename: str, contents: str) -> str:
+        return write_file(filename=filename, contents=contents, file_type="private")
+
+    @tools.action(description='Append `contents` to the end of a private file named `filename`. Creates the file if it does not exist.')
+    def append_private_file(filename: str, contents: str) -> str:
+        return append_file(filename=filename, contents=contents, file_type="private")
+
+    @tools.action(description='Replace `old_str` with `new_str` in a private file named `file_name`. Pass the version from your last read as `expected_version` to fail instead of overwriting newer changes')
+    def replace_private_file_str(filename: str, old_str: str, new_str: str, expected_version: int | None = None) -> str:
+        return replace_file_str(filename=filename, old_str=old_str, new_str=new_str, file_type="private", expected_version=expected_version)
+
+    @tools.action(description='Apply a unified diff (`@@ -start,count +start,count @@` hunks) to a private file named `filename` without rewriting the whole file')
+    def patch_private_file(filename: str, diff: str, expected_version: int | None = None) -> str:
+        return patch_file(filename=filename, diff=diff, file_type="private", expected_version=expected_version)
+
+    @tools.action(description='Share a private file named `filename` (a download or a draft) with the team without reading and rewriting it: it is linked into the collaborative files, or the output files with `to="output"`, under the same name')
+    async def publish_private_file(filename: str, to: str = "collab") -> str:
+        return await publish_file(filename=filename, to=to)
+
+    @tools.action(description='Before downloading a file, pass its `url` to check whether another agent already downloaded it. If so, the download is linked into your private files and its file name is returned')
+    async def find_shared_download(url: str) -> str:
+        return await find_download(url=url)
+
+    @tools.action(description='Read a collaborative file named `filename`. Optionally pass `start` (first line, or first page for PDFs) and `limit` (number of lines or pages) to page through large files')
+    async def read_collab_file(filename: str, start: int = 0, limit: int | None = None) -> str:
+        return await read_file(filename=filename, file_type="collab", start=start, limit=limit)
+
+    @tools.action(description='Write `contents` to a collaborative file named `filename`. Overwrites collaborative file if it already exists.')
+    def write_collab_file(filename: str, contents: str) -> str:
+        return write_file(filename=filename, contents=contents, file_type="collab")
+
+    @tools.action(description='Append `contents` to the end of a collaborative file named `filename`. Creates the file if it does not exist.')
+    def append_collab_file(filename: str, contents: str) -> str:
+        return append_file(filename=filename, contents=contents, file_type="collab")
+
+    @tools.action(description='Replace `old_str` with `new_str` in a collaborative file named `file_name`. Pass the version from your last read as `expected_version` to fail instead of overwriting newer changes')
+    def replace_collab_file_str(filename: str, old_str: str, new_str: str, expected_version: int | None = None) -> str:
+        return replace_file_str(filename=filename, old_str=old_str, new_str=new_str, file_type="collab", expected_version=expected_version)
+
+    @tools.action(description='Apply a unified diff (`@@ -start,count +start,count @@` hunks) to a collaborative file named `filename` without rewriting the whole file')
+    def patch_collab_file(filename: str, diff: str, expected_version: int | None = None) -> str:
+        return patch_file(filename=filename, diff=diff, file_type="collab", expected_version=expected_version)
+
+    @tools.action(description='Read a output file named `filename`. Optionally pass `start` (first line, or first page for PDFs) and `limit` (number of lines or pages) to page through large files')
+    async def read_output_file(filename: str, start: int = 0, limit: int | None = None) -> str:
+        return await read_file(filename=filename, file_type="output", start=start, limit=limit)
+
+    @tools.action(description='Write `contents` to an output file named `filename`. Overwrites output file if it already exists.')
+    def write_output_file(filename: str, contents: str) -> str:
+        return write_file(filename=filename, contents=contents, file_type="output")
+
+    @tools.action(description='Append `contents` to the end of an output file named `filename`. Creates the file if it does not exist.')
+    def append_output_file(filename: str, contents: str) -> str:
+        return append_file(filename=filename, contents=contents, file_type="output")
+
+    @tools.action(description='Replace `old_str` with `new_str` in an output file named `file_name`. Pass the version from your last read as `expected_version` to fail instead of overwriting newer changes')
+    def replace_output_file_str(filename: str, old_str: str, new_str: str, expected_version: int | None = None) -> str:
+        return replace_file_str(filename=filename, old_str=old_str, new_str=new_str, file_type="output", expected_version=expected_version)
+
+    @tools.action(description='Apply a unified diff (`@@ -start,count +start,count @@` hunks) to an output file named `filename` without rewriting the whole file')
+    def patch_output_file(filename: str, diff: str, expected_version: int | None = None) -> str:
+        return patch_file(filename=filename, diff=diff, file_type="output", expected_version=expected_version)
+
+    return tools
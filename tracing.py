@@ -0,0 +1,123 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from itertools import count
+from threading import Lock
+import json
+import logging
+import time
+
+current_span: ContextVar[dict | None] = ContextVar("current_span", default=None)
+
+
+def get_logger(name: str) -> logging.Logger:
+    return logging.getLogger(f"agent_collab.{name}")
+
+
+def setup_logging(level: str = "INFO"):
+    logger = logging.getLogger("agent_collab")
+    logger.setLevel(level.upper())
+    logger.propagate = False # browser_use configures the root logger on its own
+
+    if not logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(levelname)-8s [%(name)s] %(message)s"))
+        logger.addHandler(handler)
+
+
+class Tracer:
+    # Spans for phases, model calls, browser runs and file tools, written as JSONL as they finish
+    path: str | None
+    totals: dict[str, dict[str, float]]
+
+    def __init__(self):
+        self.path = None
+        self.file = None
+        self.totals = {} # span name -> summed numeric attributes
+        self.ids = count(1)
+        self.lock = Lock()
+
+    def configure(self, path: str | None):
+        self.close()
+        self.path = path
+        self.totals = {}
+        if path is not None:
+            self.file = open(path, "a", encoding="utf-8")
+
+    @contextmanager
+    def span(self, name: str, **attributes):
+        parent = current_span.get()
+        span = {
+            "name": name,
+            "span_id": next(self.ids),
+            "parent_id": parent["span_id"] if parent else None,
+            "start": time.time(),
+            "attributes": attributes
+        }
+        token = current_span.set(span)
+        start = time.perf_counter()
+
+        try:
+            yield span["attributes"]
+        except Exception as e:
+            span["attributes"]["error"] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            current_span.reset(token)
+            span["duration_s"] = time.perf_counter() - start
+            self.finish(span)
+
+    def add(self, **counters: float):
+        # Increments counters on the innermost open span, e.g. bytes read by a tool inside a browser run
+        span = current_span.get()
+        if span is None:
+            return
+
+        with self.lock:
+            for key, value in counters.items():
+                span["attributes"][key] = span["attributes"].get(key, 0) + value
+
+    def finish(self, span: dict):
+        with self.lock:
+            totals = self.totals.setdefault(span["name"], {"count": 0, "duration_s": 0.0, "max_s": 0.0})
+            totals["count"] += 1
+            totals["duration_s"] += span["duration_s"]
+            totals["max_s"] = max(totals["max_s"], span["duration_s"])
+            for key, value in span["attributes"].items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool) and key != "agent_id" and key != "iteration":
+                    totals[key] = totals.get(key, 0) + value
+
+            if self.file is not None:
+                self.file.write(json.dumps(span, default=str) + "\n")
+                self.file.flush()
+
+    def summary(self) -> str:
+        with self.lock:
+            totals = {name: dict(values) for name, values in self.totals.items()}
+
+        if not totals:
+            return "No spans recorded."
+
+        rows = [f"{'span':<28} {'count':>6} {'total s':>10} {'mean s':>9} {'max s':>9}  totals"]
+        for name, values in sorted(totals.items(), key=lambda item: item[1]["duration_s"], reverse=True):
+            extras = ", ".join(f"{key}={value:g}" for key, value in sorted(values.items()) if key not in ("count", "duration_s", "max_s"))
+            rows.append(f"{name:<28} {values['count']:>6} {values['duration_s']:>10.2f} {values['duration_s'] / values['count']:>9.2f} {values['max_s']:>9.2f}  {extras}")
+
+        return "\n".join(rows)
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+tracer = Tracer()
+
+
+def record_usage(attributes: dict, response):
+    usage = getattr(response, "usage_metadata", None)
+    if usage is None:
+        return
+
+    attributes["prompt_tokens"] = attributes.get("prompt_tokens", 0) + (usage.prompt_token_count or 0)
+    attributes["cached_tokens"] = attributes.get("cached_tokens", 0) + (usage.cached_content_token_count or 0)
+    attributes["response_tokens"] = attributes.get("response_tokens", 0) + (usage.candidates_token_count or 0)
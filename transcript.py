@@ -0,0 +1,109 @@
+from dataclasses import asdict, dataclass, field
+from typing import Awaitable, Callable
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // 4 + 1 # Rough chars-per-token ratio, good enough for budgeting
+
+
+@dataclass
+class Turn:
+    agent_id: int
+    iteration: int
+    message: str
+    subtask_assignments: dict[str, str]
+    votes: dict[str, bool] = field(default_factory=dict)
+
+    def render(self) -> str:
+        return f"{self.message}\nMy proposed subtask assignments: {self.subtask_assignments}\n---\n"
+
+
+def summarize_turns(previous_summary: str, turns: list[Turn], max_chars: int = 3000) -> str:
+    # Extractive fallback: keep the last word of every agent and the last proposed plan
+    summary = previous_summary + "\n" if previous_summary else ""
+    if not turns:
+        return summary
+
+    last_messages = {}
+    for turn in turns:
+        last_messages[turn.agent_id] = turn.message
+
+    summary += f"Iteration {turns[-1].iteration}:\n"
+    for agent_id, message in last_messages.items():
+        summary += f"- Agent_{agent_id}: {message[:400]}\n"
+    summary += f"- Final proposed subtask assignments: {turns[-1].subtask_assignments}\n"
+
+    if len(summary) > max_chars:
+        summary = summary[-max_chars:].split("\n", 1)[-1] # Oldest iterations fall off first
+
+    return summary
+
+
+class Transcript:
+    turns: list[Turn]
+    summaries: dict[int, str]
+    token_budget: int
+    recent_turns: int
+    summarizer: Callable[[str, list[Turn]], str]
+    async_summarizer: Callable[[str, list[Turn]], Awaitable[str]] | None
+
+    def __init__(self, token_budget: int = 6000, recent_turns: int = 6, summarizer: Callable[[str, list[Turn]], str] = summarize_turns,
+                 async_summarizer: Callable[[str, list[Turn]], Awaitable[str]] | None = None):
+        self.turns = []
+        self.summaries = {} # iteration -> rolling summary of every iteration up to and including it
+        self.token_budget = token_budget
+        self.recent_turns = recent_turns
+        self.summarizer = summarizer
+        self.async_summarizer = async_summarizer # Used by render_async, so conversations on an event loop never block it
+
+    def add(self, turn: Turn):
+        self.turns.append(turn)
+
+    def state(self) -> dict:
+        return {"turns": [asdict(turn) for turn in self.turns], "summaries": self.summaries}
+
+    def restore(self, state: dict):
+        self.turns = [Turn(**turn) for turn in state["turns"]]
+        self.summaries = {int(iteration): summary for iteration, summary in state["summaries"].items()} # JSON keys are strings
+
+    def iteration_turns(self, iteration: int) -> list[Turn]:
+        return [turn for turn in self.turns if turn.iteration == iteration]
+
+    def summary(self, iteration: int) -> str:
+        # Rolling summary is built once per finished iteration and reused by every later prompt
+        if iteration < 1:
+            return ""
+
+        if iteration not in self.summaries:
+            self.summaries[iteration] = self.summarizer(self.summary(iteration - 1), self.iteration_turns(iteration))
+
+        return self.summaries[iteration]
+
+    def render(self, current_iteration: int) -> str:
+        current_turns = [turn for turn in self.turns if turn.iteration >= current_iteration]
+        summary = self.summary(current_iteration - 1)
+        budget = self.token_budget - estimate_tokens(summary)
+
+        recent = []
+        for turn in reversed(current_turns[-self.recent_turns:]):
+            rendered = turn.render()
+            budget -= estimate_tokens(rendered)
+            if budget < 0 and recent:
+                break
+            recent.insert(0, rendered)
+
+        conversation = f"Summary of earlier iterations:\n{summary}\n---\n" if summary else ""
+        omitted = len(current_turns) - len(recent)
+        if omitted > 0:
+            conversation += f"({omitted} earlier turns of this discussion omitted)\n---\n"
+
+        return conversation + "".join(recent)
+
+    async def render_async(self, current_iteration: int) -> str:
+        # Builds missing summaries with the async summarizer first, render() then finds them all
+        if self.async_summarizer is not None:
+            for iteration in range(1, current_iteration):
+                if iteration not in self.summaries:
+                    self.summaries[iteration] = await self.async_summarizer(self.summary(iteration - 1), self.iteration_turns(iteration))
+
+        return self.render(current_iteration)
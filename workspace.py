@@ -0,0 +1,64 @@
+from blob_store import Blob, BlobStore
+from document_reader import DocumentReader
+from file_store import FileStore
+from manifest import WorkspaceManifest
+from retrieval import RetrievalIndex
+from tracing import get_logger
+import os
+
+logger = get_logger(__name__)
+
+FILE_TYPES = ["private", "collab", "output"]
+
+
+class Workspace:
+    root: str
+    iteration: int
+    file_store: FileStore
+    document_reader: DocumentReader
+    manifest: WorkspaceManifest
+    retrieval_index: RetrievalIndex
+    blob_store: BlobStore
+
+    def __init__(self, root: str = "."):
+        self.root = root
+        self.iteration = 1
+        self.file_store = FileStore()
+        self.document_reader = DocumentReader() # Shared extraction cache for every agent's read tools
+        self.manifest = WorkspaceManifest()
+        os.makedirs(self.path("output"), exist_ok=True)
+        os.makedirs(self.path("collab"), exist_ok=True)
+        self.manifest.add_directory(self.path("output"), "Output Files")
+        self.manifest.add_directory(self.path("collab"), "Collaborative Files")
+        self.file_store.listeners.append(self.record_write) # Tool writes update the manifest without a directory scan
+        self.retrieval_index = RetrievalIndex(self.document_reader)
+        self.blob_store = BlobStore(root) # Downloads and published files, shared by reference
+
+    def path(self, file_type: str, agent_id: int | None = None) -> str:
+        assert file_type in FILE_TYPES, f"{file_type} is not a supported file type"
+
+        return f"{self.root}/file_system_{agent_id}" if file_type == "private" else f"{self.root}/file_system_{file_type}"
+
+    def add_agent(self, agent_id: int):
+        os.makedirs(self.path("private", agent_id), exist_ok=True)
+        self.manifest.add_directory(self.path("private", agent_id), f"Agent {agent_id}'s Private Files", owner=agent_id)
+
+    def record_write(self, path: str, contents: str | None, author: int | None):
+        self.manifest.record(path, contents, f"Agent_{author}" if author is not None else "unknown", self.iteration)
+
+    def ingest(self, path: str, url: str | None = None, author: int | None = None) -> Blob:
+        # Under the file's lock, so no write lands between hashing and relinking; a relinked file gets a new version
+        with self.file_store.lock(path):
+            blob, replaced = self.blob_store.ingest(path, url=url)
+            if replaced:
+                self.file_store.committed(path, None, author)
+
+        return blob
+
+    def record_download(self, url: str, path: str):
+        # Deduplicates the download and remembers where it came from, so teammates can reuse it
+        blob = self.ingest(path, url=url)
+        logger.info(f"Stored download of {url} as {blob.sha256[:12]} ({blob.size} bytes)")
+
+    def close(self):
+        self.document_reader.close()